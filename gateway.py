@@ -1,52 +1,277 @@
 # gateway.py
-import os, socket, threading, time, json, random
+import os, sys, signal, threading, time, json
+import multiprocessing as mp
+from collections import deque
+
+import numpy as np
+
+import metrics
+import multicast
+import transport
+import tuning
 
 HOST = os.getenv("GATEWAY_HOST", "127.0.0.1")
 PRICE_PORT = int(os.getenv("GATEWAY_PRICE_PORT", "5001"))
 NEWS_PORT  = int(os.getenv("GATEWAY_NEWS_PORT",  "5002"))
 MESSAGE_DELIMITER = os.getenv("MESSAGE_DELIMITER", "*").encode()
 SYMS = os.getenv("SYMBOLS", "AAPL,MSFT,GOOG,AMZN").split(",")
+# slow-consumer protection (see Subscriber)
+CLIENT_QUEUE = int(os.getenv("GATEWAY_CLIENT_QUEUE", "1024"))
+OVERFLOW_POLICY = os.getenv("GATEWAY_OVERFLOW_POLICY", "conflate")  # conflate | drop_oldest | disconnect
+HEARTBEAT_INTERVAL = float(os.getenv("GATEWAY_HEARTBEAT", "1.0"))
+SEND_TIMEOUT = float(os.getenv("GATEWAY_SEND_TIMEOUT", "5.0"))
+# price generation (see PriceGenerator); one tick moves every symbol
+TICK_INTERVAL = float(os.getenv("GATEWAY_TICK_INTERVAL", "0.04"))
+NEWS_INTERVAL = float(os.getenv("GATEWAY_NEWS_INTERVAL", "0.2"))
+NEWS_SYMBOL_SHARE = float(os.getenv("GATEWAY_NEWS_SYMBOL_SHARE", "0"))  # fraction of news items naming one symbol
+PRICE_STEP = float(os.getenv("GATEWAY_PRICE_STEP", "0.2"))
+PRICE_CORRELATION = float(os.getenv("GATEWAY_PRICE_CORRELATION", "0"))
+PRICE_BLOCK = int(os.getenv("GATEWAY_PRICE_BLOCK", "1024"))
+FEED_PROCESSES = os.getenv("GATEWAY_FEED_PROCESSES", "1") != "0"
 
 def _listen(port, backlog=128):
-    s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-    s.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)  # important on macOS
     try:
-        s.bind((HOST, port))
+        return transport.listen(HOST, port, backlog)
     except OSError as e:
         # surface the port value for easier debugging
-        raise RuntimeError(f"gateway bind failed on {HOST}:{port}: {e}") from e
-    s.listen(backlog)
-    return s
+        raise RuntimeError(f"gateway bind failed on {transport.describe(HOST, port)}: {e}") from e
 
-def _serve_prices():
-    srv = _listen(PRICE_PORT)
-    def handle(conn):
-        with conn:
-            prices = {sym: 100.0 for sym in SYMS}
+class Subscriber:
+    """
+    One connected client with a bounded outbound queue drained by its own sender
+    thread, so a stalled consumer never blocks the producer or other clients.
+    When the queue is full the overflow policy decides what happens:
+      - conflate:    keep only the newest frame per key (symbol), then drop oldest
+      - drop_oldest: discard the oldest queued frame
+      - disconnect:  close the client
+    Idle clients get a heartbeat frame every `heartbeat` seconds; a send that
+    blocks longer than `send_timeout` marks the client dead.
+    """
+    def __init__(self, conn, name, policy=OVERFLOW_POLICY, maxlen=CLIENT_QUEUE,
+                 heartbeat=HEARTBEAT_INTERVAL, send_timeout=SEND_TIMEOUT):
+        if policy not in ("conflate", "drop_oldest", "disconnect"):
+            raise ValueError(f"unknown overflow policy: {policy}")
+        self.conn, self.name, self.policy, self.maxlen = conn, name, policy, maxlen
+        self.heartbeat, self.send_timeout = heartbeat, send_timeout
+        self.queue = deque()            # (key, frame, enqueue_ts)
+        self.cond = threading.Condition()
+        self.closed = False
+        self.dropped = 0
+        self.lag = 0.0                  # age of the oldest frame in the last batch sent
+
+    def put(self, key, frame, ts):
+        return self.put_many(((key, frame),), ts)
+
+    def put_many(self, items, ts):
+        """Enqueue (key, frame) pairs under one lock acquisition."""
+        with self.cond:
+            for key, frame in items:
+                if self.closed: return False
+                if len(self.queue) >= self.maxlen:
+                    self._overflow()
+                    if self.closed: return False
+                self.queue.append((key, frame, ts))
+            self.cond.notify()
+        return True
+
+    def _overflow(self):
+        if self.policy == "disconnect":
+            self.closed = True
+            self.cond.notify()
+            metrics.incr("slow_consumer_disconnects")
+            return
+        before = len(self.queue)
+        if self.policy == "conflate":
+            latest = {}
+            for item in self.queue: latest[item[0]] = item
+            self.queue = deque(sorted(latest.values(), key=lambda it: it[2]))
+        if len(self.queue) >= self.maxlen:
+            self.queue.popleft()
+        self.dropped += before - len(self.queue)
+        metrics.incr("frames_dropped", before - len(self.queue))
+
+    def start(self):
+        threading.Thread(target=self._send_loop, name=f"send-{self.name}", daemon=True).start()
+        return self
+
+    def _send_loop(self):
+        self.conn.settimeout(self.send_timeout)
+        try:
             while True:
-                sym = random.choice(SYMS)
-                prices[sym] += random.uniform(-0.2, 0.2)
-                msg = {"type":"price","sym":sym,"px":round(prices[sym],4),"ts":time.time()}
-                conn.sendall(json.dumps(msg).encode() + MESSAGE_DELIMITER)
-                time.sleep(0.01)
+                with self.cond:
+                    if not self.queue and not self.closed:
+                        self.cond.wait(self.heartbeat)
+                    if self.closed: break
+                    batch, self.queue = self.queue, deque()
+                now = time.time()
+                if batch:
+                    self.lag = now - batch[0][2]
+                    metrics.observe("client_lag", self.lag)
+                    self.conn.sendall(b"".join(item[1] for item in batch))
+                else:
+                    self.lag = 0.0
+                    self.conn.sendall(json.dumps({"type":"heartbeat","ts":now}).encode() + MESSAGE_DELIMITER)
+                metrics.gauge(f"{self.name}.lag", self.lag)
+                metrics.gauge(f"{self.name}.dropped", self.dropped)
+        except OSError:
+            # includes send timeouts: a client this far behind is treated as dead
+            metrics.incr("client_disconnects")
+        finally:
+            self.close()
+            metrics.drop_gauge(f"{self.name}.lag")
+            metrics.drop_gauge(f"{self.name}.dropped")
+
+    def depth(self):
+        return len(self.queue)
+
+    def close(self):
+        with self.cond:
+            self.closed = True
+            self.cond.notify()
+        try: self.conn.close()
+        except OSError: pass
+
+
+class _Feed:
+    """Fan-out from one producer to every Subscriber of a server socket."""
+    def __init__(self, name, srv):
+        self.name, self.srv = name, srv
+        self.subs = []
+        self.lock = threading.Lock()
+        self.accepted = 0
+
+    def accept_loop(self):
+        while True:
+            c, _ = self.srv.accept()
+            self.accepted += 1
+            sub = Subscriber(c, f"{self.name}{self.accepted}")
+            with self.lock: self.subs.append(sub)
+            sub.start()
+
+    def publish(self, key, frame):
+        self.publish_many(((key, frame),))
+
+    def publish_many(self, items):
+        now = time.time()
+        with self.lock:
+            self.subs = [s for s in self.subs if not s.closed]
+            subs = list(self.subs)
+        for s in subs: s.put_many(items, now)
+        metrics.gauge(f"{self.name}_clients", len(subs))
+        metrics.gauge(f"{self.name}_queue_depth", max((s.depth() for s in subs), default=0))
+
+    def start(self):
+        threading.Thread(target=self.accept_loop, daemon=True).start()
+        return self
+
+class PriceGenerator:
+    """
+    Random walk for all symbols at once. Steps are drawn a block at a time into
+    pre-allocated arrays (uniform in +/-step, or Gaussian with the same variance
+    and pairwise correlation `corr`), and every tick reuses pre-encoded frame
+    prefixes, so the per-tick Python work is one vector add plus formatting.
+    """
+    def __init__(self, symbols, start=100.0, step=PRICE_STEP, corr=PRICE_CORRELATION,
+                 block=PRICE_BLOCK, seed=None):
+        n = len(symbols)
+        self.symbols = list(symbols)
+        self.prices = np.full(n, float(start))
+        self.step, self._rng = step, np.random.default_rng(seed)
+        self._steps = np.empty((block, n))
+        self._row = block
+        if corr:
+            cov = np.full((n, n), corr); np.fill_diagonal(cov, 1.0)
+            self._chol_t = np.linalg.cholesky(cov).T * (step / np.sqrt(3.0))  # uniform(-s,s) std
+            self._z = np.empty((block, n))
+        else:
+            self._chol_t = None
+        self._prefix = [b'{"type":"price","sym":"' + s.encode() + b'","px":' for s in self.symbols]
+        self._suffix = b',"ts":%.6f}' + MESSAGE_DELIMITER
+
+    def _refill(self):
+        if self._chol_t is None:
+            self._rng.random(out=self._steps)
+            self._steps *= 2.0 * self.step
+            self._steps -= self.step
+        else:
+            self._rng.standard_normal(out=self._z)
+            np.matmul(self._z, self._chol_t, out=self._steps)
+        self._row = 0
+
+    def tick(self):
+        """Advance every symbol one step; returns the (shared) price array."""
+        if self._row == len(self._steps):
+            self._refill()
+        self.prices += self._steps[self._row]
+        self._row += 1
+        return self.prices
+
+    def frames(self, ts):
+        """Encoded frames for the current prices, one per symbol."""
+        suffix = self._suffix % ts
+        return [pre + b"%.4f" % px + suffix for pre, px in zip(self._prefix, self.prices.tolist())]
+
+def _serve_prices():
+    """One walk per Gateway, fanned out to TCP subscribers and (optionally) multicast."""
+    feed = _Feed("price", _listen(PRICE_PORT)).start()
+    pub = None
+    if multicast.MCAST_GROUP:
+        pub = multicast.MulticastPublisher(multicast.MCAST_GROUP, multicast.MCAST_PORT)
+        recovery = _listen(multicast.RECOVERY_PORT)
+        threading.Thread(target=pub.serve_recovery, args=(recovery,), daemon=True).start()
+    gen = PriceGenerator(SYMS)
+    deadline = time.monotonic()
     while True:
-        c, _ = srv.accept()
-        threading.Thread(target=handle, args=(c,), daemon=True).start()
+        prices = gen.tick()
+        ts = time.time()
+        feed.publish_many(list(zip(SYMS, gen.frames(ts))))
+        metrics.incr("ticks_sent", len(SYMS))
+        if pub is not None:
+            for sym, px in zip(SYMS, prices.tolist()):
+                pub.publish({"type":"price","sym":sym,"px":round(px,4),"ts":ts})
+            metrics.incr("mcast_ticks_sent", len(SYMS))
+        deadline += TICK_INTERVAL
+        delay = deadline - time.monotonic()
+        if delay > 0: time.sleep(delay)
+        else: deadline = time.monotonic()   # fell behind; don't burst to catch up
 
 def _serve_news():
-    srv = _listen(NEWS_PORT)
-    def handle(conn):
-        with conn:
-            while True:
-                msg = {"type":"news","sentiment": random.randint(0,100), "ts": time.time()}
-                conn.sendall(json.dumps(msg).encode() + MESSAGE_DELIMITER)
-                time.sleep(0.2)
+    feed = _Feed("news", _listen(NEWS_PORT)).start()
+    rng = np.random.default_rng()
     while True:
-        c, _ = srv.accept()
-        threading.Thread(target=handle, args=(c,), daemon=True).start()
+        scores = rng.integers(0, 101, size=256).tolist()
+        picks = rng.integers(0, len(SYMS), size=256).tolist()
+        named = (rng.random(256) < NEWS_SYMBOL_SHARE).tolist()
+        for score, pick, is_sym in zip(scores, picks, named):
+            msg = {"type":"news","sentiment": score, "ts": time.time()}
+            if is_sym: msg["sym"] = SYMS[pick]
+            feed.publish("news", json.dumps(msg).encode() + MESSAGE_DELIMITER)
+            metrics.incr("news_sent")
+            time.sleep(NEWS_INTERVAL)
+
+FEEDS = {"price": _serve_prices, "news": _serve_news}
+
+def _run_feed(name):
+    metrics.start(f"gateway-{name}")
+    FEEDS[name]()
 
 def run_gateway():
-    t1 = threading.Thread(target=_serve_prices, daemon=True)
-    t2 = threading.Thread(target=_serve_news,   daemon=True)
-    t1.start(); t2.start()
-    t1.join(); t2.join()
+    """
+    Each feed runs in its own process so price and news generation don't share
+    a GIL. Daemonic processes (e.g. the test fixture) may not have children, so
+    they - and GATEWAY_FEED_PROCESSES=0 - fall back to one thread per feed.
+    """
+    metrics.start("gateway")
+    tuning.apply("gateway")   # feed processes inherit affinity and priority
+    if FEED_PROCESSES and not mp.current_process().daemon:
+        workers = [mp.Process(target=_run_feed, args=(n,), name=f"Gateway-{n}", daemon=True) for n in FEEDS]
+        # terminate() on the Gateway must not orphan the feed processes
+        signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+    else:
+        workers = [threading.Thread(target=f, name=f"Gateway-{n}", daemon=True) for n, f in FEEDS.items()]
+    for w in workers: w.start()
+    try:
+        for w in workers: w.join()
+    finally:
+        for w in workers:
+            if isinstance(w, mp.Process) and w.is_alive(): w.terminate()
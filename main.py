@@ -14,39 +14,55 @@ from orderbook import run_orderbook
 from strategy import run_strategy
 from order_manager import run_ordermanager
 
-def main():
+STRATEGY_PROCESSES = int(os.getenv("STRATEGY_PROCESSES", "1"))
+
+COMPONENTS = {
+    "Gateway": run_gateway,
+    "OrderManager": run_ordermanager,
+    "OrderBook": run_orderbook,
+    "Strategy": run_strategy,
+}
+
+def start_component(name, instance=None):
+    """Start one component in its own process (Strategy may run several instances)."""
+    p = Process(target=COMPONENTS[name], name=name if instance is None else f"{name}-{instance}")
+    p.start()
+    return p
+
+def start_stack(n_strategies=STRATEGY_PROCESSES):
     """
-    Starts all components in order:
-    1. Gateway (news stream)
-    2. OrderBook (price feed + shared memory)
-    3. Strategy (reads shared memory + sends orders)
-    4. OrderManager (receives and logs orders)
+    Starts all components in order and returns their processes:
+    1. Gateway (price + news streams)
+    2. OrderManager (receives and logs orders)
+    3. OrderBook (price + news feeds -> shared memory)
+    4. Strategy x n_strategies (reads shared memory + sends orders)
     """
-    print("[Main] Starting trading system...")
+    procs = []
 
     # --- Step 1: Start Gateway ---
-    p_gateway = Process(target=run_gateway, name="Gateway")
-    p_gateway.start()
+    procs.append(start_component("Gateway"))
     time.sleep(1)  # give server time to bind
 
     # --- Step 2: Start OrderManager ---
-    p_om = Process(target=run_ordermanager, name="OrderManager")
-    p_om.start()
+    procs.append(start_component("OrderManager"))
     time.sleep(1)
 
     # --- Step 3: Start OrderBook ---
-    # run_orderbook() should print the shared memory name
-    # which strategy.py will need to connect.
-    p_ob = Process(target=run_orderbook, name="OrderBook")
-    p_ob.start()
+    # run_orderbook() publishes the price book under $PRICEBOOK_NAME;
+    # Strategy attaches by that name and reads the layout from its header.
+    procs.append(start_component("OrderBook"))
     time.sleep(2)
 
     # --- Step 4: Start Strategy ---
-    p_st = Process(target=run_strategy, name="Strategy")
-    p_st.start()
+    for i in range(n_strategies):
+        procs.append(start_component("Strategy", i if n_strategies > 1 else None))
+    return procs
+
+def main():
+    print("[Main] Starting trading system...")
+    processes = start_stack()
 
     # --- Wait for all to finish ---
-    processes = [p_gateway, p_om, p_ob, p_st]
     for p in processes:
         p.join()
 
@@ -0,0 +1,297 @@
+# metrics.py
+# ---------------------------------------------------
+# Lightweight in-process metrics registry and profiler hooks.
+#
+# Each process calls metrics.start("<component>") once; after that the
+# module-level helpers (incr / gauge / observe) record into that
+# process's registry. Nothing is exported unless asked for:
+#   METRICS_DIR       -> dump a JSON snapshot to <dir>/<component>-<pid>.json
+#                        every METRICS_INTERVAL seconds
+#   METRICS_HOST      -> stats socket; a client connects and receives one
+#                        delimited JSON snapshot ("unix:///path" or a TCP host)
+#   PROFILE           -> comma-separated components to profile ("all" for every one)
+#   PROFILE_MODE      -> "sample" (all threads, folded stacks) or "cprofile" (main thread)
+#   PROFILE_DIR       -> where profiles are written (default: METRICS_DIR or ".")
+# ---------------------------------------------------
+
+import bisect
+import json
+import os
+import signal
+import sys
+import threading
+import time
+from collections import Counter
+from multiprocessing.util import Finalize
+
+import transport
+
+METRICS_DIR = os.getenv("METRICS_DIR", "")
+METRICS_HOST = os.getenv("METRICS_HOST", "")
+METRICS_INTERVAL = float(os.getenv("METRICS_INTERVAL", "1.0"))
+PROFILE = os.getenv("PROFILE", "")
+PROFILE_MODE = os.getenv("PROFILE_MODE", "sample")
+PROFILE_DIR = os.getenv("PROFILE_DIR", "") or METRICS_DIR or "."
+PROFILE_SAMPLE_INTERVAL = float(os.getenv("PROFILE_SAMPLE_INTERVAL", "0.005"))
+MESSAGE_DELIMITER = os.getenv("MESSAGE_DELIMITER", "*").encode()
+
+# Histogram bucket upper bounds in seconds: 1us .. 10s on a 1-2-5 ladder.
+BUCKETS = [m * 10.0 ** e for e in range(-6, 2) for m in (1, 2, 5)]
+
+
+class Histogram:
+    """Fixed-bucket histogram; percentiles are reported as bucket upper bounds (capped at the max)."""
+
+    __slots__ = ("counts", "count", "total", "total_sq", "min", "max")
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.total_sq = 0.0
+        self.min = float("inf")
+        self.max = 0.0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(BUCKETS, value)] += 1
+        self.count += 1
+        self.total += value
+        self.total_sq += value * value
+        if value < self.min:
+            self.min = value
+        if value > self.max:
+            self.max = value
+
+    @classmethod
+    def from_summary(cls, s):
+        """Rebuild a histogram from summary() output, e.g. another process's JSON dump."""
+        h = cls()
+        if s.get("count"):
+            h.counts = list(s["buckets"])
+            h.count = s["count"]
+            h.total = s["mean"] * h.count
+            h.total_sq = (s["stdev"] ** 2 + s["mean"] ** 2) * h.count
+            h.min, h.max = s["min"], s["max"]
+        return h
+
+    def merge(self, other):
+        """Fold another histogram in (aggregating the same metric across processes)."""
+        self.counts = [a + b for a, b in zip(self.counts, other.counts)]
+        self.count += other.count
+        self.total += other.total
+        self.total_sq += other.total_sq
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        return self
+
+    def percentile(self, q):
+        if not self.count:
+            return None
+        target = q * self.count
+        seen = 0
+        for i, c in enumerate(self.counts):
+            seen += c
+            if seen >= target:
+                return min(BUCKETS[i], self.max) if i < len(BUCKETS) else self.max
+        return self.max
+
+    def summary(self):
+        if not self.count:
+            return {"count": 0}
+        mean = self.total / self.count
+        p50, p99 = self.percentile(0.50), self.percentile(0.99)
+        return {
+            "count": self.count,
+            "mean": mean,
+            "stdev": max(0.0, self.total_sq / self.count - mean * mean) ** 0.5,
+            "min": self.min,
+            "max": self.max,
+            "p50": p50,
+            "p90": self.percentile(0.90),
+            "p99": p99,
+            "jitter": p99 - p50,   # spread of the tail over the median
+            "buckets": list(self.counts),
+        }
+
+
+class Registry:
+    """Counters, gauges and histograms for one process."""
+
+    def __init__(self, component):
+        self.component = component
+        self.started = time.time()
+        self.endpoint = None
+        self._lock = threading.Lock()
+        self._counters = {}
+        self._gauges = {}
+        self._hists = {}
+        self._rates = {}
+        self._prev = ({}, time.time())
+
+    def incr(self, name, n=1):
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + n
+
+    def gauge(self, name, value):
+        self._gauges[name] = value
+
+    def drop_gauge(self, name):
+        self._gauges.pop(name, None)
+
+    def observe(self, name, value):
+        with self._lock:
+            h = self._hists.get(name)
+            if h is None:
+                h = self._hists[name] = Histogram()
+            h.observe(value)
+
+    def get(self, name):
+        return self._counters.get(name, 0)
+
+    def snapshot(self):
+        now = time.time()
+        with self._lock:
+            counters = dict(self._counters)
+            hists = {k: h.summary() for k, h in self._hists.items()}
+            prev, prev_ts = self._prev
+            if now - prev_ts >= METRICS_INTERVAL * 0.5:
+                dt = now - prev_ts
+                self._rates = {k: (v - prev.get(k, 0)) / dt for k, v in counters.items()}
+                self._prev = (counters, now)
+            rates = dict(self._rates)
+        return {
+            "component": self.component,
+            "pid": os.getpid(),
+            "ts": now,
+            "uptime": now - self.started,
+            "endpoint": self.endpoint,
+            "counters": counters,
+            "rates": rates,
+            "gauges": dict(self._gauges),
+            "histograms": hists,
+        }
+
+
+_registry = Registry(os.getenv("METRICS_COMPONENT", "main"))
+
+
+def registry():
+    return _registry
+
+
+def incr(name, n=1):
+    _registry.incr(name, n)
+
+
+def gauge(name, value):
+    _registry.gauge(name, value)
+
+
+def drop_gauge(name):
+    _registry.drop_gauge(name)
+
+
+def observe(name, value):
+    _registry.observe(name, value)
+
+
+# ---------- exporters ----------
+
+def _dump_loop(reg, path):
+    tmp = path + ".tmp"
+    while True:
+        time.sleep(METRICS_INTERVAL)
+        try:
+            with open(tmp, "w") as f:
+                json.dump(reg.snapshot(), f)
+            os.replace(tmp, path)
+        except OSError as e:
+            print(f"[Metrics] dump to {path} failed: {e}", flush=True)
+
+
+def _serve_stats(reg, srv):
+    while True:
+        c, _ = srv.accept()
+        with c:
+            try:
+                c.sendall(json.dumps(reg.snapshot()).encode() + MESSAGE_DELIMITER)
+            except OSError:
+                pass
+
+
+def _stats_listen(component):
+    if METRICS_HOST.startswith(transport.UNIX_PREFIX):
+        port = f"{component}-{os.getpid()}"
+    else:
+        port = 0
+    srv = transport.listen(METRICS_HOST, port, 16)
+    addr = srv.getsockname()
+    return srv, addr if isinstance(addr, str) else f"{addr[0]}:{addr[1]}"
+
+
+# ---------- profilers ----------
+
+def _profiling(component):
+    wanted = {c.strip().lower() for c in PROFILE.split(",") if c.strip()}
+    return "all" in wanted or component.lower() in wanted
+
+
+def _sample_loop(path, own_ident):
+    """Collect folded stacks (flamegraph.pl / speedscope format) for every thread."""
+    stacks = Counter()
+    last_write = time.time()
+    while True:
+        time.sleep(PROFILE_SAMPLE_INTERVAL)
+        for ident, frame in sys._current_frames().items():
+            if ident == own_ident:
+                continue
+            names = []
+            while frame is not None:
+                code = frame.f_code
+                names.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+                frame = frame.f_back
+            stacks[";".join(reversed(names))] += 1
+        if time.time() - last_write >= METRICS_INTERVAL:
+            last_write = time.time()
+            with open(path + ".tmp", "w") as f:
+                for stack, n in stacks.most_common():
+                    f.write(f"{stack} {n}\n")
+            os.replace(path + ".tmp", path)
+
+
+def _start_profiler(component):
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    base = os.path.join(PROFILE_DIR, f"{component}-{os.getpid()}")
+    if PROFILE_MODE == "cprofile":
+        import cProfile
+        prof = cProfile.Profile()
+        # multiprocessing children skip atexit, but run exit-priority finalizers
+        # (and so does the main process, via multiprocessing's own atexit hook)
+        Finalize(None, prof.dump_stats, args=(base + ".prof",), exitpriority=100)
+        # terminate() sends SIGTERM; turn it into a normal exit so finalizers run
+        signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+        prof.enable()
+        print(f"[Metrics] cProfile enabled for {component} -> {base}.prof", flush=True)
+    else:
+        def run():
+            _sample_loop(base + ".folded", threading.get_ident())
+        threading.Thread(target=run, name="metrics-sampler", daemon=True).start()
+        print(f"[Metrics] sampling profiler enabled for {component} -> {base}.folded", flush=True)
+
+
+def start(component):
+    """Create this process's registry and start whichever exporters the env asks for."""
+    global _registry
+    _registry = Registry(component)
+    if METRICS_DIR:
+        os.makedirs(METRICS_DIR, exist_ok=True)
+        path = os.path.join(METRICS_DIR, f"{component}-{os.getpid()}.json")
+        threading.Thread(target=_dump_loop, args=(_registry, path), daemon=True).start()
+    if METRICS_HOST:
+        srv, endpoint = _stats_listen(component)
+        _registry.endpoint = endpoint
+        threading.Thread(target=_serve_stats, args=(_registry, srv), daemon=True).start()
+        print(f"[Metrics] {component} stats at {endpoint}", flush=True)
+    if PROFILE and _profiling(component):
+        _start_profiler(component)
+    return _registry
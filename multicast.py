@@ -0,0 +1,199 @@
+# multicast.py
+# ---------------------------------------------------
+# Optional UDP multicast transport for the price feed.
+# The publisher sends every tick exactly once to a multicast group,
+# so its cost does not depend on how many consumers have joined.
+# Each datagram carries a sequence number; consumers that see a gap
+# ask the TCP recovery channel for a retransmit or a full snapshot.
+# ---------------------------------------------------
+
+import json
+import os
+import socket
+import struct
+import threading
+from collections import deque
+
+import transport
+
+MCAST_GROUP = os.getenv("GATEWAY_MCAST_GROUP", "")          # empty -> disabled
+MCAST_PORT = int(os.getenv("GATEWAY_MCAST_PORT", "5004"))
+MCAST_IFACE = os.getenv("GATEWAY_MCAST_IFACE", "127.0.0.1")  # loopback by default
+MCAST_TTL = int(os.getenv("GATEWAY_MCAST_TTL", "1"))
+RECOVERY_PORT = int(os.getenv("GATEWAY_RECOVERY_PORT", "5005"))
+HISTORY = int(os.getenv("GATEWAY_MCAST_HISTORY", "4096"))
+MESSAGE_DELIMITER = os.getenv("MESSAGE_DELIMITER", "*").encode()
+MAX_DATAGRAM = 65507
+
+
+def _frame(obj) -> bytes:
+    return json.dumps(obj).encode() + MESSAGE_DELIMITER
+
+
+class MulticastPublisher:
+    """
+    Sends sequence-numbered JSON datagrams to a multicast group and keeps
+    the last `history` payloads around for retransmit requests.
+    """
+
+    def __init__(self, group, port, iface=MCAST_IFACE, ttl=MCAST_TTL, history=HISTORY):
+        self.group = group
+        self.port = port
+        self.seq = 0
+        self._history = deque(maxlen=history)   # payloads for seq (seq - len + 1 .. seq)
+        self._last = {}                         # sym -> latest px, for snapshots
+        self._lock = threading.Lock()
+
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM, socket.IPPROTO_UDP)
+        self.sock.setsockopt(socket.IPPROTO_IP, socket.IP_MULTICAST_TTL, ttl)
+        self.sock.setsockopt(socket.IPPROTO_IP, socket.IP_MULTICAST_LOOP, 1)
+        self.sock.setsockopt(socket.IPPROTO_IP, socket.IP_MULTICAST_IF, socket.inet_aton(iface))
+
+    def publish(self, msg: dict) -> int:
+        """Stamp `msg` with the next sequence number and send it once."""
+        with self._lock:
+            self.seq += 1
+            msg["seq"] = self.seq
+            payload = json.dumps(msg).encode()
+            self._history.append(payload)
+            if "sym" in msg:
+                self._last[msg["sym"]] = msg.get("px")
+        self.sock.sendto(payload, (self.group, self.port))
+        return msg["seq"]
+
+    def retransmit(self, first, last):
+        """Return (first_available, payloads) for the inclusive range [first, last]."""
+        with self._lock:
+            oldest = self.seq - len(self._history) + 1
+            lo = max(first, oldest)
+            hi = min(last, self.seq)
+            payloads = [self._history[s - oldest] for s in range(lo, hi + 1)]
+        return lo, payloads
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {"type": "snapshot", "seq": self.seq, "prices": dict(self._last)}
+
+    def serve_recovery(self, srv):
+        """Accept recovery clients on the listening socket `srv` (blocks until `srv` is closed)."""
+        while True:
+            try:
+                c, _ = srv.accept()
+            except OSError:
+                return
+            threading.Thread(target=self._handle_recovery, args=(c,), daemon=True).start()
+
+    def _handle_recovery(self, conn):
+        buf = b""
+        with conn:
+            while True:
+                data = conn.recv(4096)
+                if not data:
+                    break
+                buf += data
+                parts = buf.split(MESSAGE_DELIMITER)
+                buf = parts[-1]
+                for raw in parts[:-1]:
+                    if not raw:
+                        continue
+                    try:
+                        req = json.loads(raw.decode())
+                        kind = req.get("type")
+                        if kind == "retransmit":
+                            first, last = int(req["from"]), int(req["to"])
+                    except (ValueError, KeyError, TypeError, AttributeError):
+                        continue   # malformed request: skip the frame
+                    if kind == "snapshot":
+                        conn.sendall(_frame(self.snapshot()))
+                    elif kind == "retransmit":
+                        lo, payloads = self.retransmit(first, last)
+                        out = b"".join(p + MESSAGE_DELIMITER for p in payloads)
+                        conn.sendall(out + _frame({"type": "end", "from": lo, "to": last}))
+
+    def close(self):
+        self.sock.close()
+
+
+class MulticastReceiver:
+    """
+    Joins the multicast group and yields price messages in sequence order.
+    Gaps are repaired through the recovery channel; if the publisher no longer
+    holds the missing range, a {"type": "snapshot"} message is yielded instead.
+    """
+
+    def __init__(self, group, port, recovery_addr, iface=MCAST_IFACE, timeout=5.0):
+        # recovery_addr is (host, port); host may be unix:///path
+        self.recovery_addr = recovery_addr
+        self.expected = None
+        self._rsock = None
+        self._rbuf = b""
+        self.timeout = timeout
+
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM, socket.IPPROTO_UDP)
+        self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.sock.bind(("", port))
+        mreq = struct.pack("4s4s", socket.inet_aton(group), socket.inet_aton(iface))
+        self.sock.setsockopt(socket.IPPROTO_IP, socket.IP_ADD_MEMBERSHIP, mreq)
+        self.sock.settimeout(timeout)
+
+    def _request(self, req):
+        if self._rsock is None:
+            self._rsock = transport.connect(*self.recovery_addr, timeout=self.timeout)
+            self._rbuf = b""
+        self._rsock.sendall(_frame(req))
+
+    def _read_frame(self):
+        while MESSAGE_DELIMITER not in self._rbuf:
+            data = self._rsock.recv(65536)
+            if not data:
+                raise ConnectionResetError("recovery channel closed")
+            self._rbuf += data
+        raw, self._rbuf = self._rbuf.split(MESSAGE_DELIMITER, 1)
+        return json.loads(raw.decode())
+
+    def snapshot(self) -> dict:
+        self._request({"type": "snapshot"})
+        snap = self._read_frame()
+        self.expected = snap["seq"] + 1
+        return snap
+
+    def recover(self, first, last):
+        """Fetch [first, last] from the publisher; fall back to a snapshot."""
+        self._request({"type": "retransmit", "from": first, "to": last})
+        msgs = []
+        while True:
+            msg = self._read_frame()
+            if msg.get("type") == "end":
+                break
+            msgs.append(msg)
+        if msgs and msgs[0]["seq"] == first:
+            return msgs
+        return [self.snapshot()]
+
+    def __iter__(self):
+        while True:
+            data, _ = self.sock.recvfrom(MAX_DATAGRAM)
+            try:
+                msg = json.loads(data.decode())
+                if not isinstance(msg, dict):
+                    raise ValueError("datagram is not an object")
+                seq = int(msg["seq"])
+            except (ValueError, KeyError, TypeError):   # e.g. "seq": null
+                continue
+            if self.expected is None:
+                self.expected = seq
+            if seq < self.expected:
+                continue  # duplicate or already covered by a snapshot
+            if seq > self.expected:
+                for m in self.recover(self.expected, seq - 1):
+                    if m.get("type") == "snapshot" or m["seq"] >= self.expected:
+                        yield m
+                if seq < self.expected:
+                    continue
+            self.expected = seq + 1
+            yield msg
+
+    def close(self):
+        self.sock.close()
+        if self._rsock is not None:
+            self._rsock.close()
@@ -1,16 +1,51 @@
 # order_manager.py
-import os, socket, threading, json
+import os, threading, json, time
+
+import metrics
+import risk
+import transport
+import tuning
 
 HOST = os.getenv("ORDERMANAGER_HOST", "127.0.0.1")
 PORT = int(os.getenv("ORDERMANAGER_PORT", "5003"))
 MESSAGE_DELIMITER = os.getenv("MESSAGE_DELIMITER", "*").encode()
+SYMS = os.getenv("SYMBOLS", "AAPL,MSFT,GOOG,AMZN").split(",")
+RISK_ENABLED = os.getenv("RISK_ENABLED", "1") != "0"
+
+_risk = risk.RiskEngine(SYMS)
+_risk_lock = threading.Lock()
 
 def _listen():
-    s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-    s.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
-    s.bind((HOST, PORT))
-    s.listen(128)
-    return s
+    return transport.listen(HOST, PORT, 128)
+
+def _num(v):
+    try: return float(v)
+    except (TypeError, ValueError): return float("nan")
+
+def _pre_trade(o):
+    """Run the risk checks for one order dict; returns a reason code (risk.OK = accept)."""
+    sym = o.get("symbol", o.get("sym"))
+    if not isinstance(sym, str):
+        return risk.UNKNOWN_SYMBOL   # a list / object would not even hash
+    side = o.get("side")
+    side = side if isinstance(side, str) else None   # -> bad_side
+    px = _num(o.get("price", o.get("px")))
+    t0 = time.perf_counter()
+    with _risk_lock:
+        code = _risk.check(sym, side, _num(o.get("qty")), px, time.monotonic())
+    metrics.observe("risk_check_time", time.perf_counter() - t0)
+    return code
+
+def _reject(conn, o, code):
+    metrics.incr("orders_rejected")
+    metrics.incr(f"rejected.{risk.REASONS[code]}")
+    msg = {"type":"reject","id":o.get("id"),"symbol":o.get("symbol", o.get("sym")),
+           "side":o.get("side"),"strategy":o.get("strategy"),"reason":risk.REASONS[code],"ts":time.time()}
+    try:
+        conn.sendall(json.dumps(msg).encode() + MESSAGE_DELIMITER)
+    except OSError:
+        pass
+    print(f"Rejected Order {o.get('id','?')}: {risk.REASONS[code]}", flush=True)
 
 def _handle(conn, addr):
     buf = b""
@@ -24,15 +59,34 @@ def _handle(conn, addr):
                 if not raw: continue
                 try:
                     o = json.loads(raw.decode())
-                    print(f"Received Order {o.get('id','?')}: {o.get('side','?')} "
-                          f"{o.get('qty','?')} {o.get('sym','?')} @ {o.get('px','?')}", flush=True)
-                except Exception:
-                    # ignore garbage frames in tests
-                    pass
+                    if not isinstance(o, dict):
+                        raise ValueError("order frame is not an object")
+                except ValueError:
+                    # ignore garbage frames in tests, but count them
+                    metrics.incr("malformed_frames")
+                    continue
+                metrics.incr("orders")
+                ts = o.get("timestamp", o.get("ts"))
+                if isinstance(ts, (int, float)):
+                    metrics.observe("order_latency", time.time() - ts)
+                if RISK_ENABLED:
+                    code = _pre_trade(o)
+                    if code != risk.OK:
+                        _reject(conn, o, code)
+                        continue
+                metrics.incr("orders_accepted")
+                print(f"Received Order {o.get('id','?')}: {o.get('side','?')} "
+                      f"{o.get('qty','?')} {o.get('symbol', o.get('sym','?'))} @ "
+                      f"{o.get('price', o.get('px','?'))}", flush=True)
             buf = parts[-1]
+            metrics.gauge("rx_buffer_bytes", len(buf))
+    metrics.incr("connections", -1)
 
 def run_ordermanager():
+    metrics.start("ordermanager")
+    tuning.apply("ordermanager")
     srv = _listen()
     while True:
         c, addr = srv.accept()
+        metrics.incr("connections")
         threading.Thread(target=_handle, args=(c, addr), daemon=True).start()
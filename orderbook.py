@@ -1,87 +1,210 @@
 # orderbook.py
 # --------------------------------------------
-# OrderBook: connects to Gateway (7001) and updates shared memory.
-# Stores latest prices in shared memory for Strategy to read.
-# Uses Lock for atomic writes and auto-reconnect on failure.
+# OrderBook: connects to Gateway's price feed and updates shared memory.
+# Publishes latest prices in the self-describing SharedPriceBook
+# (name: $PRICEBOOK_NAME) for Strategy to attach to.
+# A news-ingest thread writes sentiment into the same book, so Strategy
+# processes need no news socket of their own.
+# Seqlock writes and auto-reconnect on failure.
 # --------------------------------------------
 
-import socket
+import json
+import os
+import signal
+import sys
+import threading
 import time
-import numpy as np
-from multiprocessing import shared_memory, Lock
-import traceback
 
-GATEWAY_HOST = "localhost"
-GATEWAY_PORT = 7001
-SYMBOLS = ["AAPL", "MSFT", "AMZN"]
+import metrics
+import transport
+import tuning
+from shared_memory_utils import SharedPriceBook
+
+# unix:///path hosts select a Unix domain socket (see transport.py)
+GATEWAY_HOST = os.getenv("GATEWAY_HOST", "127.0.0.1")
+GATEWAY_PORT = int(os.getenv("GATEWAY_PRICE_PORT", "5001"))
+NEWS_PORT = int(os.getenv("GATEWAY_NEWS_PORT", "5002"))
+NEWS_INGEST = os.getenv("ORDERBOOK_NEWS", "1") != "0"
+SYMBOLS = os.getenv("SYMBOLS", "AAPL,MSFT,GOOG,AMZN").split(",")
 MESSAGE_DELIMITER = b"*"
+RECV_TIMEOUT = 5.0
+PRINT_INTERVAL = float(os.getenv("ORDERBOOK_PRINT_INTERVAL", "1.0"))   # price line on stdout at most this often
 
-def connect_to_gateway():
-    """Try to connect to Gateway and return socket."""
+def connect_to_gateway(busy_poll=False):
+    """Try to connect to Gateway and return socket (non-blocking when busy-polling)."""
     while True:
         try:
-            sock = socket.create_connection((GATEWAY_HOST, GATEWAY_PORT))
-            print(f"[OrderBook] Connected to Gateway at {GATEWAY_HOST}:{GATEWAY_PORT}")
-            sock.settimeout(5)
+            sock = transport.connect(GATEWAY_HOST, GATEWAY_PORT)
+            print(f"[OrderBook] Connected to Gateway at {transport.describe(GATEWAY_HOST, GATEWAY_PORT)}")
+            if busy_poll:
+                sock.setblocking(False)
+            else:
+                sock.settimeout(RECV_TIMEOUT)
             return sock
         except (ConnectionRefusedError, OSError):
             print("[OrderBook] Gateway unavailable, retrying in 3s...")
             time.sleep(3)
 
-def update_prices(buffer: bytes, shared_array, lock):
+def parse_price(chunk: str):
+    """Return (sym, px, ts) from a JSON price tick or a "SYM,px" line; ts may be None."""
+    if chunk.startswith("{"):
+        msg = json.loads(chunk)
+        if msg.get("type") not in ("price", "tick"):
+            return None
+        sym = msg.get("sym", msg.get("symbol"))
+        if not isinstance(sym, str):
+            raise TypeError(f"price frame symbol is not a string: {sym!r}")
+        return sym, float(msg.get("px", msg.get("price"))), msg.get("ts")
+    sym, val = chunk.split(",")
+    return sym, float(val), None
+
+def parse_news(chunk: str):
+    """Return (score, sym) from a JSON news frame or a legacy "label,score" line; sym may be None."""
+    if chunk.startswith("{"):
+        msg = json.loads(chunk)
+        if msg.get("type") not in ("news", "sentiment"):
+            return None
+        score, sym = msg.get("sentiment"), msg.get("sym", msg.get("symbol"))
+        if sym is not None and not isinstance(sym, str):
+            raise TypeError(f"news frame symbol is not a string: {sym!r}")
+    else:
+        score, sym = chunk.split(",", 1)[1], None
+    return max(0.0, min(100.0, float(score))), sym
+
+
+class NewsIngest(threading.Thread):
+    """Gateway news stream -> sentiment slot in the shared book (one per host, not per Strategy)."""
+
+    def __init__(self, book, host=GATEWAY_HOST, port=NEWS_PORT):
+        super().__init__(name="OrderBook-news", daemon=True)
+        self.book = book
+        self.host = host
+        self.port = port
+        self._halt = threading.Event()
+
+    def stop(self):
+        self._halt.set()
+
+    def ingest(self, buffer: bytes):
+        for chunk in buffer.decode(errors="ignore").split(MESSAGE_DELIMITER.decode()):
+            chunk = chunk.strip()
+            if not chunk:
+                continue
+            try:
+                news = parse_news(chunk)
+            except (ValueError, TypeError, AttributeError, IndexError):
+                metrics.incr("malformed_news_frames")
+                continue
+            if news is None:
+                continue
+            score, sym = news
+            if sym is not None and sym not in self.book.index:
+                metrics.incr("unknown_symbol")
+                continue
+            self.book.update_sentiment(score, sym)
+            metrics.incr("news_frames_parsed")
+
+    def run(self):
+        while not self._halt.is_set():
+            try:
+                sock = transport.connect(self.host, self.port, timeout=RECV_TIMEOUT)
+                print(f"[OrderBook] Connected to news stream at {transport.describe(self.host, self.port)}")
+                buffer = b""
+                with sock:
+                    while not self._halt.is_set():
+                        chunk = sock.recv(1024)
+                        if not chunk:
+                            raise ConnectionResetError
+                        buffer += chunk
+                        head, sep, buffer = buffer.rpartition(MESSAGE_DELIMITER)
+                        if sep and not self._halt.is_set():
+                            self.ingest(head)
+            except OSError:   # refused, reset, timeout
+                print("[OrderBook] News stream unavailable. Reconnecting in 2s...")
+                metrics.incr("news_reconnects")
+                self._halt.wait(2)
+
+
+def update_prices(buffer: bytes, book: SharedPriceBook):
     text = buffer.decode(errors="ignore")
     for chunk in text.split(MESSAGE_DELIMITER.decode()):
-        if not chunk.strip():
+        chunk = chunk.strip()
+        if not chunk:
             continue
         try:
-            sym, val = chunk.split(",")
-            val = float(val)
-            idx = np.where(shared_array["symbol"] == sym)[0]
-            if len(idx) == 1:
-                with lock:
-                    shared_array[idx[0]]["price"] = val
-        except Exception:
+            tick = parse_price(chunk)
+        except (ValueError, TypeError, AttributeError):
+            metrics.incr("malformed_frames")
             continue
+        metrics.incr("frames_parsed")
+        if tick is None:
+            continue  # heartbeats and other non-price frames
+        sym, val, ts = tick
+        i = book.index.get(sym)
+        if i is not None:
+            book.update_index(i, val, ts if isinstance(ts, (int, float)) else None)
+            metrics.incr("ticks")
+            if isinstance(ts, (int, float)):
+                metrics.observe("tick_latency", time.time() - ts)
+        else:
+            metrics.incr("unknown_symbol")
 
 def main():
-    dtype = np.dtype([("symbol", "U8"), ("price", "f8")])
-    data = np.zeros(len(SYMBOLS), dtype=dtype)
-    data["symbol"] = SYMBOLS
-
-    shm = shared_memory.SharedMemory(create=True, size=data.nbytes)
-    shared_array = np.ndarray(data.shape, dtype=data.dtype, buffer=shm.buf)
-    shared_array[:] = data[:]
-    lock = Lock()
-
-    print(f"[OrderBook] Shared memory created: name={shm.name}")
-    print(f"[OrderBook] Initial data:\n{shared_array}\n")
+    metrics.start("orderbook")
+    # terminate() sends SIGTERM; exit normally so the book is still unlinked
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+    busy = tuning.apply("orderbook").get("busy_poll", False)
+    book = SharedPriceBook.create(SYMBOLS)
+    print(f"[OrderBook] Shared price book ready: name={book.name} symbols={book.symbols} pid={book.writer_pid}")
+    news = NewsIngest(book)
+    if NEWS_INGEST:
+        news.start()
 
-    sock = connect_to_gateway()
+    sock = connect_to_gateway(busy)
     buffer = b""
+    last_rx = time.monotonic()
+    last_print = 0.0
     try:
         while True:
             try:
-                chunk = sock.recv(1024)
+                try:
+                    chunk = sock.recv(1024)
+                except BlockingIOError:
+                    # busy-poll: spin on the socket; heartbeats keep last_rx fresh
+                    if time.monotonic() - last_rx > RECV_TIMEOUT:
+                        raise TimeoutError
+                    continue
                 if not chunk:
                     raise ConnectionResetError
+                last_rx = time.monotonic()
+                book.touch()
                 buffer += chunk
                 parts = buffer.split(MESSAGE_DELIMITER)
                 buffer = parts[-1]
                 for part in parts[:-1]:
-                    update_prices(part + MESSAGE_DELIMITER, shared_array, lock)
-                with lock:
-                    snapshot = shared_array.copy()
-                print("[OrderBook]", ", ".join(f"{r['symbol']}={r['price']:.2f}" for r in snapshot))
+                    update_prices(part + MESSAGE_DELIMITER, book)
+                metrics.gauge("rx_buffer_bytes", len(buffer))
+                if last_rx - last_print >= PRINT_INTERVAL:
+                    last_print = last_rx
+                    _, prices, _ = book.snapshot()
+                    print("[OrderBook]", ", ".join(f"{s}={p:.2f}" for s, p in zip(book.symbols, prices)))
             except (ConnectionResetError, BrokenPipeError, TimeoutError):
                 print("[OrderBook] Connection lost. Reconnecting...")
+                metrics.incr("reconnects")
+                lost = time.monotonic()
                 sock.close()
                 time.sleep(3)
-                sock = connect_to_gateway()
+                sock = connect_to_gateway(busy)
+                last_rx = time.monotonic()
+                metrics.observe("reconnect_time", last_rx - lost)
     except KeyboardInterrupt:
         print("\n[OrderBook] Shutting down.")
     finally:
-        shm.close()
-        shm.unlink()
+        news.stop()
+        if news.is_alive():
+            news.join(1.0)
+        book.close()
+        book.unlink()
 
 def run_orderbook():
     main()
@@ -0,0 +1,92 @@
+# risk.py
+# ---------------------------------------------------
+# Pre-trade risk checks for OrderManager.
+# Limits and state live in NumPy arrays indexed by symbol id, so a check
+# is a handful of O(1) array reads and writes with no per-order dicts.
+# Checks, in order: quantity/price sanity, order-rate throttle (token
+# bucket), price collar around the last accepted price, per-order
+# notional, and resulting position. Every order that gets past the
+# throttle takes a token, whether or not a later limit rejects it.
+# ---------------------------------------------------
+
+import os
+
+import numpy as np
+
+MAX_POSITION = float(os.getenv("RISK_MAX_POSITION", "100"))          # shares, absolute
+MAX_NOTIONAL = float(os.getenv("RISK_MAX_NOTIONAL", "100000"))       # per order, qty * px
+MAX_ORDER_RATE = float(os.getenv("RISK_MAX_ORDER_RATE", "20"))       # orders/s per symbol
+ORDER_BURST = float(os.getenv("RISK_ORDER_BURST", "") or MAX_ORDER_RATE)
+PRICE_COLLAR = float(os.getenv("RISK_PRICE_COLLAR", "0.10"))         # fraction of reference price
+
+# reason codes returned by RiskEngine.check (0 = accepted)
+OK = 0
+REASONS = ("ok", "unknown_symbol", "bad_side", "bad_qty", "bad_price",
+           "rate_limit", "price_collar", "notional_limit", "position_limit")
+UNKNOWN_SYMBOL, BAD_SIDE, BAD_QTY, BAD_PRICE, RATE_LIMIT, PRICE_COLLAR_BREACH, \
+    NOTIONAL_LIMIT, POSITION_LIMIT = range(1, len(REASONS))
+
+SIDES = {"BUY": 1.0, "SELL": -1.0}
+
+
+class RiskEngine:
+    """Per-symbol limits and state as float64 arrays; see module header."""
+
+    def __init__(self, symbols, max_position=MAX_POSITION, max_notional=MAX_NOTIONAL,
+                 max_rate=MAX_ORDER_RATE, burst=ORDER_BURST, collar=PRICE_COLLAR):
+        self.symbols = list(symbols)
+        self.ids = {s: i for i, s in enumerate(self.symbols)}
+        n = len(self.symbols)
+        # limits (broadcast scalars; adjust per symbol with set_limits)
+        self.max_position = np.full(n, max_position)
+        self.max_notional = np.full(n, max_notional)
+        self.max_rate = np.full(n, max_rate)
+        self.burst = np.full(n, burst)
+        self.collar = np.full(n, collar)
+        # state
+        self.position = np.zeros(n)
+        self.tokens = np.full(n, burst)
+        self.last_refill = np.zeros(n)
+        self.ref_px = np.full(n, np.nan)
+        self.rejects = np.zeros((n, len(REASONS)), dtype=np.int64)
+
+    def set_limits(self, symbol=None, **limits):
+        """Override limits for one symbol (or all when symbol is None)."""
+        idx = slice(None) if symbol is None else self.ids[symbol]
+        for name, value in limits.items():
+            getattr(self, name)[idx] = value
+
+    def check(self, symbol, side, qty, px, now):
+        """Return a reason code; on OK the order is booked against position and throttle."""
+        i = self.ids.get(symbol)
+        if i is None:
+            return UNKNOWN_SYMBOL
+        sign = SIDES.get(side)
+        if sign is None:
+            code = BAD_SIDE
+        elif not qty > 0:
+            code = BAD_QTY
+        elif not px > 0:
+            code = BAD_PRICE
+        else:
+            tokens = min(self.burst[i], self.tokens[i] + (now - self.last_refill[i]) * self.max_rate[i])
+            self.last_refill[i] = now
+            ref = self.ref_px[i]
+            new_pos = self.position[i] + sign * qty
+            if tokens < 1.0:
+                self.tokens[i] = tokens
+                code = RATE_LIMIT
+            else:
+                self.tokens[i] = tokens - 1.0   # taken before the limits: rejects are throttled too
+                if ref == ref and abs(px - ref) > self.collar[i] * ref:   # ref == ref: not NaN
+                    code = PRICE_COLLAR_BREACH
+                elif qty * px > self.max_notional[i]:
+                    code = NOTIONAL_LIMIT
+                elif abs(new_pos) > self.max_position[i]:
+                    code = POSITION_LIMIT
+                else:
+                    self.position[i] = new_pos
+                    self.ref_px[i] = px
+                    return OK
+        self.rejects[i, code] += 1
+        return code
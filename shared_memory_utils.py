@@ -1,51 +1,333 @@
 # shared_memory_utils.py
+# ---------------------------------------------------
+# Self-describing shared price book.
+#
+# Region layout (little-endian):
+#   [0, 128)       header: magic, layout version, counts, writer pid,
+#                  heartbeat, seqlock counter, news slot (version, market
+#                  sentiment, time of last news)
+#   [128, ...)     symbol table: n_symbols x S16
+#   [...]          column table: n_columns x (name S16, dtype S8, offset u8)
+#   [...]          one 64-byte-aligned array per column, n_symbols long
+#
+# A reader needs only the region name (PRICEBOOK_NAME): the header tells it
+# the symbols and where each column lives. Writers bump `seq` to an odd value
+# before writing and back to even afterwards (seqlock), so readers can take
+# consistent snapshots without a lock. Sentiment goes through the same
+# seqlock: a market-wide score in the header plus an optional per-symbol
+# column (NaN = no symbol-specific news, use the market score).
+# ---------------------------------------------------
 import os, time
 import numpy as np
-from multiprocessing import shared_memory
+from multiprocessing import shared_memory, resource_tracker
 from threading import Lock
 
+MAGIC = b"PXBOOK\x00\x00"
+LAYOUT_VERSION = 2
+HEADER_SIZE = 128
+HEADER = np.dtype([
+    ("magic", "S8"),
+    ("version", "<u4"),
+    ("n_symbols", "<u4"),
+    ("n_columns", "<u4"),
+    ("data_offset", "<u4"),
+    ("writer_pid", "<i8"),
+    ("heartbeat", "<f8"),
+    ("seq", "<u8"),
+    ("created", "<f8"),
+    ("news_seq", "<u8"),
+    ("sentiment", "<f8"),
+    ("news_ts", "<f8"),
+])
+SYMBOL = np.dtype("S16")
+COLUMN = np.dtype([("name", "S16"), ("dtype", "S8"), ("offset", "<u8")])
+COLUMNS = (("price", "<f8"), ("ts", "<f8"), ("sentiment", "<f8"))
+ALIGN = 64
+STALE_AFTER = float(os.getenv("PRICEBOOK_STALE_AFTER", "10"))
+NEUTRAL_SENTIMENT = 50.0
+
+_created_here = set()   # regions this process created (and its resource tracker owns)
+
+
+class LayoutError(ValueError):
+    """The region exists but does not hold a price book this code understands."""
+
+
+def _align(n):
+    return (n + ALIGN - 1) // ALIGN * ALIGN
+
+
+def _layout(n_symbols):
+    """Return (column table offset, {name: (dtype, offset)}, total size)."""
+    col_table = HEADER_SIZE + n_symbols * SYMBOL.itemsize
+    offset = _align(col_table + len(COLUMNS) * COLUMN.itemsize)
+    cols = {}
+    for name, dt in COLUMNS:
+        cols[name] = (np.dtype(dt), offset)
+        offset = _align(offset + n_symbols * np.dtype(dt).itemsize)
+    return col_table, cols, offset
+
+
+def _pid_alive(pid):
+    if pid <= 0:
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
 class SharedPriceBook:
     """
-    Minimal shared price table:
-      - symbols: list[str]
-      - array dtype: float64 prices only (expand later if you like)
-    Creates the region if it doesn't exist; otherwise attaches.
+    Shared price table with a versioned, self-describing header.
+      SharedPriceBook(symbols, name)      create-or-attach (existing API)
+      SharedPriceBook.create(symbols)     become the writer
+      SharedPriceBook.attach()            zero-config reader; symbols come from the header
     """
-    def __init__(self, symbols, name=None, create=None):
-        self.symbols = list(symbols)
-        self.index = {s: i for i, s in enumerate(self.symbols)}
+    def __init__(self, symbols=None, name=None, create=None):
         self.name = name or os.getenv("PRICEBOOK_NAME", "pricebook")
-        self.dtype = np.float64
-        self.n = len(self.symbols)
         self._lock = Lock()
+        self.owner = False
+
+        if create is not False:
+            if symbols is None:
+                raise ValueError("symbols are required to create a price book")
+            try:
+                self._create(list(symbols))
+                return
+            except FileExistsError:
+                if create:
+                    self._replace_dead(list(symbols))
+                    return
+        self._attach()
+        if symbols is not None and list(symbols) != self.symbols:
+            self.close()
+            raise LayoutError(f"{self.name}: symbols {self.symbols} != requested {list(symbols)}")
+
+    @classmethod
+    def create(cls, symbols, name=None):
+        return cls(symbols, name=name, create=True)
 
-        nbytes = self.n * np.dtype(self.dtype).itemsize
+    @classmethod
+    def attach(cls, name=None, timeout=5.0):
+        """Attach by name, waiting up to `timeout` s for a writer to publish the region."""
+        deadline = time.monotonic() + timeout
+        while True:
+            try:
+                return cls(None, name=name, create=False)
+            except (FileNotFoundError, LayoutError):
+                if time.monotonic() >= deadline:
+                    raise
+                time.sleep(0.05)
 
-        # auto-create if missing
+    # ---------- setup ----------
+
+    def _create(self, symbols):
+        col_table, cols, size = _layout(len(symbols))
+        self.shm = shared_memory.SharedMemory(name=self.name, create=True, size=size)
+        self.owner = True
+        _created_here.add(self.shm._name)
+        self._map(symbols, cols)
+        buf = self.shm.buf
+        np.ndarray((len(symbols),), SYMBOL, buf, HEADER_SIZE)[:] = [s.encode() for s in symbols]
+        table = np.ndarray((len(COLUMNS),), COLUMN, buf, col_table)
+        for i, (cname, dt) in enumerate(COLUMNS):
+            table[i] = (cname.encode(), dt.encode(), cols[cname][1])
+        self.price[:] = np.nan
+        self.ts[:] = 0.0
+        self.sym_sentiment[:] = np.nan
+        h = self.header
+        h["sentiment"] = NEUTRAL_SENTIMENT
+        h["version"] = LAYOUT_VERSION
+        h["n_symbols"] = len(symbols)
+        h["n_columns"] = len(COLUMNS)
+        h["data_offset"] = cols[COLUMNS[0][0]][1]
+        h["writer_pid"] = os.getpid()
+        h["created"] = h["heartbeat"] = time.time()
+        h["magic"] = MAGIC   # last: readers treat the region as valid from here on
+
+    def _replace_dead(self, symbols):
+        """create=True over an existing region: take it over only if its writer is gone."""
         try:
-            self.shm = shared_memory.SharedMemory(name=self.name, create=False)
-        except FileNotFoundError:
-            self.shm = shared_memory.SharedMemory(name=self.name, create=True, size=nbytes)
+            old = SharedPriceBook(None, name=self.name, create=False)
+        except LayoutError:
+            old = None
+        if old is not None:
+            alive = old.writer_alive()
+            pid = old.writer_pid
+            old.close()
+            if alive:
+                raise FileExistsError(f"price book {self.name!r} is owned by live writer pid {pid}")
+        stale = shared_memory.SharedMemory(name=self.name)
+        stale.unlink()
+        stale.close()
+        self._create(symbols)
+
+    def _attach(self):
+        self.shm = shared_memory.SharedMemory(name=self.name, create=False)
+        # attachers must not let their resource tracker unlink the writer's region
+        if self.shm._name not in _created_here:
+            resource_tracker.unregister(self.shm._name, "shared_memory")
+        try:
+            symbols, cols = self._read_layout(len(self.shm.buf))
+        except LayoutError:
+            self.shm.close()
+            raise
+        self._map(symbols, cols)
 
-        self.arr = np.ndarray((self.n,), dtype=self.dtype, buffer=self.shm.buf)
-        # initialize NaNs on first create
-        if np.all(self.arr == 0):  # crude check; OK for tests
-            self.arr[:] = np.nan
+    def _read_layout(self, size):
+        """Validate the header and tables; only copies are kept so close() stays possible."""
+        buf = self.shm.buf
+        if size < HEADER_SIZE:
+            raise LayoutError(f"{self.name}: region too small for a header")
+        h = np.ndarray((), HEADER, buf, 0).copy()
+        if bytes(h["magic"]).rstrip(b"\x00") != MAGIC.rstrip(b"\x00"):
+            raise LayoutError(f"{self.name}: bad magic {bytes(h['magic'])!r} (not initialised yet?)")
+        if int(h["version"]) != LAYOUT_VERSION:
+            raise LayoutError(f"{self.name}: layout version {int(h['version'])}, expected {LAYOUT_VERSION}")
+        n, ncols = int(h["n_symbols"]), int(h["n_columns"])
+        col_table = HEADER_SIZE + n * SYMBOL.itemsize
+        if col_table + ncols * COLUMN.itemsize > size:
+            raise LayoutError(f"{self.name}: symbol/column tables run past the region")
+        symbols = [s.decode() for s in np.ndarray((n,), SYMBOL, buf, HEADER_SIZE).tolist()]
+        table = np.ndarray((ncols,), COLUMN, buf, col_table).copy()
+        found = {r["name"].decode(): (np.dtype(r["dtype"].decode()), int(r["offset"])) for r in table}
+        cols = {}
+        for cname, dt in COLUMNS:
+            if cname not in found or found[cname][0] != np.dtype(dt):
+                raise LayoutError(f"{self.name}: missing or mistyped column {cname!r}")
+            dtype, off = found[cname]
+            if off + n * dtype.itemsize > size:
+                raise LayoutError(f"{self.name}: column {cname!r} runs past the region")
+            cols[cname] = found[cname]
+        return symbols, cols
 
-    def update(self, symbol, price):
-        i = self.index[symbol]
+    def _map(self, symbols, cols):
+        self.symbols = symbols
+        self.index = {s: i for i, s in enumerate(symbols)}
+        self.n = len(symbols)
+        buf = self.shm.buf
+        self.header = np.ndarray((), HEADER, buf, 0)
+        self._seq = np.ndarray((1,), "<u8", buf, HEADER.fields["seq"][1])
+        self._heartbeat = np.ndarray((1,), "<f8", buf, HEADER.fields["heartbeat"][1])
+        self._news_seq = np.ndarray((1,), "<u8", buf, HEADER.fields["news_seq"][1])
+        self._news = np.ndarray((2,), "<f8", buf, HEADER.fields["sentiment"][1])   # sentiment, news_ts
+        self.price = np.ndarray((self.n,), cols["price"][0], buf, cols["price"][1])
+        self.ts = np.ndarray((self.n,), cols["ts"][0], buf, cols["ts"][1])
+        self.sym_sentiment = np.ndarray((self.n,), cols["sentiment"][0], buf, cols["sentiment"][1])
+
+    # ---------- writer ----------
+
+    def update(self, symbol, price, ts=None):
+        self.update_index(self.index[symbol], price, ts)
+
+    def update_index(self, i, price, ts=None):
+        now = time.time()
         with self._lock:
-            self.arr[i] = float(price)
+            self._seq[0] += 1          # odd: write in progress
+            self.price[i] = float(price)
+            self.ts[i] = now if ts is None else ts
+            self._heartbeat[0] = now
+            self._seq[0] += 1          # even: consistent
+
+    def update_sentiment(self, score, symbol=None, ts=None):
+        """Publish market-wide sentiment, or one symbol's when `symbol` is given."""
+        now = time.time()
+        with self._lock:
+            self._seq[0] += 1
+            if symbol is None:
+                self._news[0] = float(score)
+            else:
+                self.sym_sentiment[self.index[symbol]] = float(score)
+            self._news[1] = now if ts is None else ts
+            self._news_seq[0] += 1
+            self._heartbeat[0] = now
+            self._seq[0] += 1
+
+    def touch(self):
+        """Refresh the writer heartbeat without changing prices."""
+        self._heartbeat[0] = time.time()
+
+    # ---------- readers ----------
+
+    @property
+    def seq(self):
+        return int(self._seq[0])
+
+    @property
+    def writer_pid(self):
+        return int(self.header["writer_pid"])
+
+    def heartbeat_age(self):
+        return time.time() - float(self._heartbeat[0])
+
+    def writer_alive(self, stale_after=STALE_AFTER):
+        """True if the writer process exists and has written/touched recently."""
+        return _pid_alive(self.writer_pid) and self.heartbeat_age() <= stale_after
 
     def read(self, symbol):
         i = self.index[symbol]
-        return float(self.arr[i])
+        return float(self.price[i])
+
+    def snapshot(self, out_price=None, out_ts=None):
+        """Consistent copy of (seq, prices, timestamps) via the seqlock."""
+        price = np.empty(self.n) if out_price is None else out_price
+        ts = np.empty(self.n) if out_ts is None else out_ts
+        for _ in range(100000):
+            s1 = self._seq[0]
+            if s1 & 1:
+                continue
+            price[:] = self.price
+            ts[:] = self.ts
+            if self._seq[0] == s1:
+                return int(s1), price, ts
+        # a writer that died mid-update leaves seq odd forever; hand back what is there
+        price[:] = self.price
+        ts[:] = self.ts
+        return int(self._seq[0]), price, ts
+
+    @property
+    def news_seq(self):
+        """Bumped on every sentiment write; unchanged means nothing to re-read."""
+        return int(self._news_seq[0])
+
+    def sentiment(self, out=None):
+        """
+        Consistent (news_seq, market, per_symbol) via the seqlock. `per_symbol`
+        already falls back to the market score where a symbol has no news.
+        """
+        per = np.empty(self.n) if out is None else out
+        for _ in range(100000):
+            s1 = self._seq[0]
+            if s1 & 1:
+                continue
+            market = float(self._news[0])
+            news_seq = int(self._news_seq[0])
+            per[:] = self.sym_sentiment
+            if self._seq[0] == s1:
+                break
+        else:
+            # a writer that died mid-update leaves seq odd forever; hand back what is there
+            market = float(self._news[0])
+            news_seq = int(self._news_seq[0])
+            per[:] = self.sym_sentiment
+        np.copyto(per, market, where=np.isnan(per))
+        return news_seq, market, per
 
     def close(self):
-        self.shm.close()
+        # drop views first so the mmap can actually be released; the lock waits
+        # out an in-flight write from another thread of this process
+        with self._lock:
+            for attr in ("header", "_seq", "_heartbeat", "_news_seq", "_news", "price", "ts", "sym_sentiment"):
+                self.__dict__.pop(attr, None)
+            self.shm.close()
 
     def unlink(self):
         try:
             self.shm.unlink()
         except FileNotFoundError:
             pass
+        _created_here.discard(self.shm._name)
@@ -0,0 +1,556 @@
+# soak.py
+# ---------------------------------------------------
+# Soak / load harness: runs the whole stack from main.py at a given
+# Gateway rate, symbol count and number of Strategy processes for a fixed
+# duration, then writes performance_report.md from what it measured.
+#
+#   python soak.py --duration 60 --symbols 50 --tick-interval 0.001 --strategies 4 \
+#                  --restart-gateway 30 --json soak.json --baseline last-night.json
+#
+# Every process dumps its metrics registry into a scratch METRICS_DIR
+# (see metrics.py); the harness samples RSS / CPU of its process tree from
+# /proc, optionally restarts the Gateway mid-run to time reconnects, and
+# aggregates everything per component. --json keeps the raw numbers (with
+# the commit) so nightly runs can be compared; --baseline diffs against one.
+# ---------------------------------------------------
+
+import argparse
+import contextlib
+import glob
+import json
+import os
+import platform
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+DEFAULT_SYMBOLS = ["AAPL", "MSFT", "GOOG", "AMZN"]
+SAMPLE_INTERVAL = 0.5
+CLK_TCK = os.sysconf("SC_CLK_TCK") if hasattr(os, "sysconf") else 100
+PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+# (report label, component prefix, histogram)
+HOPS = [
+    ("Gateway -> OrderBook (tick applied)", "orderbook", "tick_latency"),
+    ("Gateway tick -> Strategy order", "strategy", "decision_latency"),
+    ("Strategy -> OrderManager (order received)", "ordermanager", "order_latency"),
+    ("Strategy decision cycle", "strategy", "cycle_time"),
+    ("OrderManager risk check", "ordermanager", "risk_check_time"),
+    ("Gateway subscriber lag", "gateway", "client_lag"),
+]
+# (report label, component prefix, counter)
+RATES = [
+    ("Gateway ticks sent", "gateway", "ticks_sent"),
+    ("Gateway news sent", "gateway", "news_sent"),
+    ("OrderBook ticks applied", "orderbook", "ticks"),
+    ("OrderBook news applied", "orderbook", "news_frames_parsed"),
+    ("Strategy cycles", "strategy", "cycles"),
+    ("Strategy orders sent", "strategy", "orders"),
+    ("OrderManager orders received", "ordermanager", "orders"),
+    ("OrderManager orders accepted", "ordermanager", "orders_accepted"),
+]
+# (report label, component prefix, counter)
+FAULTS = [
+    ("Gateway frames dropped (slow consumer)", "gateway", "frames_dropped"),
+    ("Gateway slow-consumer disconnects", "gateway", "slow_consumer_disconnects"),
+    ("OrderBook malformed frames", "orderbook", "malformed_frames"),
+    ("OrderBook price reconnects", "orderbook", "reconnects"),
+    ("OrderBook news reconnects", "orderbook", "news_reconnects"),
+    ("Strategy OrderManager reconnects", "strategy", "ordermanager_reconnects"),
+    ("Strategy book re-attaches", "strategy", "book_reattaches"),
+    ("Strategy stale-book cycles", "strategy", "stale_book_cycles"),
+    ("OrderManager risk rejects", "ordermanager", "orders_rejected"),
+]
+# headline numbers compared against --baseline: (key, label, higher_is_better)
+HEADLINE = [
+    ("gateway_ticks_per_s", "Gateway ticks/s", True),
+    ("orderbook_ticks_per_s", "OrderBook ticks/s", True),
+    ("strategy_cycles_per_s", "Strategy cycles/s", True),
+    ("orders_per_s", "Orders/s at OrderManager", True),
+    ("tick_latency_p50_ms", "Gateway -> OrderBook p50 (ms)", False),
+    ("tick_latency_p99_ms", "Gateway -> OrderBook p99 (ms)", False),
+    ("decision_latency_p99_ms", "Tick -> order p99 (ms)", False),
+    ("order_latency_p99_ms", "Strategy -> OrderManager p99 (ms)", False),
+    ("ticks_not_applied", "Ticks sent but not applied", False),
+    ("reconnect_s", "Gateway restart -> first fresh tick (s)", False),
+    ("rss_total_mb", "Total RSS (MB)", False),
+    ("cpu_total_pct", "Total CPU (%)", False),
+]
+
+
+def parse_args(argv=None):
+    p = argparse.ArgumentParser(description="Full-stack soak/load run that writes the performance report")
+    p.add_argument("--duration", type=float, default=30.0, help="Measured seconds (after warm-up)")
+    p.add_argument("--warmup", type=float, default=3.0, help="Seconds to let Strategy attach and fill its windows")
+    p.add_argument("--symbols", type=int, default=len(DEFAULT_SYMBOLS), help="Number of symbols on the feed")
+    p.add_argument("--tick-interval", type=float, default=0.04, help="Gateway seconds per tick (all symbols)")
+    p.add_argument("--news-interval", type=float, default=0.2, help="Gateway seconds between news items")
+    p.add_argument("--strategies", type=int, default=1, help="Number of Strategy processes")
+    p.add_argument("--restart-gateway", type=float, default=None, metavar="T",
+                   help="Kill and restart the Gateway T seconds into the run to time reconnects")
+    p.add_argument("--outage", type=float, default=1.0, help="Seconds the Gateway stays down on restart")
+    p.add_argument("--out", default="performance_report.md", help="Markdown report path")
+    p.add_argument("--json", default=None, help="Also write the raw results here")
+    p.add_argument("--baseline", default=None, help="Earlier --json output to compare against")
+    p.add_argument("--log", default=None, help="Where component stdout goes (default: <metrics dir>/stack.log)")
+    return p.parse_args(argv)
+
+
+def symbol_names(n):
+    return DEFAULT_SYMBOLS[:n] + [f"SYM{i:03d}" for i in range(len(DEFAULT_SYMBOLS), n)]
+
+
+def _free_port():
+    with contextlib.closing(socket.socket()) as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _commit():
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                             cwd=os.path.dirname(os.path.abspath(__file__)), timeout=5)
+        return out.stdout.strip() or "unknown"
+    except (OSError, subprocess.SubprocessError):
+        return "unknown"
+
+
+def configure_env(args, metrics_dir):
+    """Component config is read from env at import time, so this runs before importing main."""
+    os.environ.update({
+        "SYMBOLS": ",".join(symbol_names(args.symbols)),
+        "GATEWAY_HOST": "127.0.0.1",
+        "ORDERMANAGER_HOST": "127.0.0.1",
+        "GATEWAY_PRICE_PORT": str(_free_port()),
+        "GATEWAY_NEWS_PORT": str(_free_port()),
+        "ORDERMANAGER_PORT": str(_free_port()),
+        "GATEWAY_TICK_INTERVAL": str(args.tick_interval),
+        "GATEWAY_NEWS_INTERVAL": str(args.news_interval),
+        "PRICEBOOK_NAME": f"pricebook-soak-{os.getpid()}",
+        "METRICS_DIR": metrics_dir,
+        "METRICS_INTERVAL": str(SAMPLE_INTERVAL),
+    })
+
+
+# ---------- /proc sampling ----------
+
+def _descendants(root):
+    kids = {}
+    for d in os.listdir("/proc"):
+        if not d.isdigit():
+            continue
+        try:
+            with open(f"/proc/{d}/stat") as f:
+                ppid = int(f.read().rsplit(")", 1)[1].split()[1])
+        except (OSError, ValueError, IndexError):
+            continue
+        kids.setdefault(ppid, []).append(int(d))
+    out, todo = [], [root]
+    while todo:
+        for c in kids.get(todo.pop(), ()):
+            out.append(c)
+            todo.append(c)
+    return out
+
+
+def _proc_sample(pid):
+    """(cpu seconds, rss bytes) or None if the process is gone."""
+    try:
+        with open(f"/proc/{pid}/stat") as f:
+            fields = f.read().rsplit(")", 1)[1].split()
+        with open(f"/proc/{pid}/statm") as f:
+            rss_pages = int(f.read().split()[1])
+    except (OSError, ValueError, IndexError):
+        return None
+    return (int(fields[11]) + int(fields[12])) / CLK_TCK, rss_pages * PAGE_SIZE
+
+
+class ProcessSampler:
+    """RSS and CPU time of every process under this one, sampled from /proc."""
+
+    def __init__(self, root=None):
+        self.root = root or os.getpid()
+        self.procs = {}   # pid -> {"first": (t, cpu), "last": (t, cpu), "rss_max", "rss_sum", "n"}
+        self._next = 0.0
+
+    def sample(self, force=False):
+        now = time.monotonic()
+        if not force and now < self._next:
+            return
+        self._next = now + SAMPLE_INTERVAL
+        for pid in _descendants(self.root):
+            s = _proc_sample(pid)
+            if s is None:
+                continue
+            cpu, rss = s
+            rec = self.procs.setdefault(pid, {"first": (now, cpu), "rss_max": 0, "rss_sum": 0, "n": 0})
+            rec["last"] = (now, cpu)
+            rec["rss_max"] = max(rec["rss_max"], rss)
+            rec["rss_sum"] += rss
+            rec["n"] += 1
+
+    def results(self):
+        out = {}
+        for pid, r in self.procs.items():
+            (t0, c0), (t1, c1) = r["first"], r["last"]
+            out[pid] = {
+                "rss_max_mb": r["rss_max"] / 2 ** 20,
+                "rss_mean_mb": r["rss_sum"] / r["n"] / 2 ** 20,
+                "cpu_pct": 100.0 * (c1 - c0) / (t1 - t0) if t1 > t0 else 0.0,
+            }
+        return out
+
+
+# ---------- metrics aggregation ----------
+
+def read_metrics(metrics_dir):
+    """Latest dumped snapshot per process: {pid: snapshot}."""
+    snaps = {}
+    for path in glob.glob(os.path.join(metrics_dir, "*.json")):
+        try:
+            with open(path) as f:
+                snap = json.load(f)
+        except (OSError, ValueError):
+            continue
+        snaps[snap["pid"]] = snap
+    return snaps
+
+
+def _matches(snap, prefix):
+    return snap["component"] == prefix or snap["component"].startswith(prefix + "-")
+
+
+def counter_delta(before, after, prefix, name):
+    """Increase of a counter between two reads, summed across every process of a component
+    (including processes that started or exited in between, e.g. a restarted Gateway)."""
+    total = 0
+    for pid, snap in after.items():
+        if _matches(snap, prefix):
+            prev = before.get(pid)
+            total += snap["counters"].get(name, 0) - (prev["counters"].get(name, 0) if prev else 0)
+    return total
+
+
+def merged_histogram(snaps, prefix, name):
+    import metrics
+    h = metrics.Histogram()
+    for snap in snaps.values():
+        s = snap["histograms"].get(name)
+        if s and _matches(snap, prefix):
+            h.merge(metrics.Histogram.from_summary(s))
+    return h.summary()
+
+
+def collect(args, before, after, window, sampler, book_info, restart):
+    """Everything the report shows, as plain JSON-able data."""
+    components = {pid: snap["component"] for pid, snap in after.items()}
+    procs = []
+    for pid, r in sorted(sampler.results().items()):
+        if pid in components:   # skip helpers such as the resource tracker
+            procs.append({"component": components[pid], "pid": pid, **r})
+    res = {
+        "config": {
+            "duration_s": window, "symbols": args.symbols, "tick_interval_s": args.tick_interval,
+            "news_interval_s": args.news_interval, "strategies": args.strategies,
+            "restart_gateway_at_s": args.restart_gateway,
+        },
+        "env": {
+            "commit": _commit(), "date": time.strftime("%Y-%m-%d %H:%M:%S"), "python": platform.python_version(),
+            "platform": platform.platform(), "cpus": os.cpu_count(),
+        },
+        "throughput": [], "latency": [], "faults": [], "processes": procs,
+        "shared_memory": book_info, "restart": restart,
+    }
+    for label, prefix, name in RATES:
+        total = counter_delta(before, after, prefix, name)
+        res["throughput"].append({"label": label, "component": prefix, "counter": name, "total": total,
+                                  "per_s": total / window})
+    for label, prefix, name in HOPS:
+        res["latency"].append({"label": label, "component": prefix, "histogram": name,
+                               **merged_histogram(after, prefix, name)})
+    for label, prefix, name in FAULTS:
+        total = counter_delta(before, after, prefix, name)
+        res["faults"].append({"label": label, "component": prefix, "counter": name, "total": total})
+    res["faults"].append({"label": "Ticks sent but not applied", "component": "orderbook", "counter": None,
+                          "total": max(0, _find(res["throughput"], "ticks_sent")["total"]
+                                       - _find(res["throughput"], "ticks", "orderbook")["total"])})
+    res["reconnect_histogram"] = merged_histogram(after, "orderbook", "reconnect_time")
+    res["headline"] = headline(res)
+    return res
+
+
+def _find(rows, key, component=None):
+    for r in rows:
+        if key in (r.get("counter"), r.get("histogram")) and component in (None, r["component"]):
+            return r
+    return {}
+
+
+def _ms(v):
+    return None if v is None else v * 1e3
+
+
+def headline(res):
+    tp, lat = res["throughput"], res["latency"]
+    restart = res.get("restart") or {}
+    return {
+        "gateway_ticks_per_s": _find(tp, "ticks_sent")["per_s"],
+        "orderbook_ticks_per_s": _find(tp, "ticks", "orderbook")["per_s"],
+        "strategy_cycles_per_s": _find(tp, "cycles")["per_s"],
+        "orders_per_s": _find(tp, "orders", "ordermanager")["per_s"],
+        "tick_latency_p50_ms": _ms(_find(lat, "tick_latency").get("p50")),
+        "tick_latency_p99_ms": _ms(_find(lat, "tick_latency").get("p99")),
+        "decision_latency_p99_ms": _ms(_find(lat, "decision_latency").get("p99")),
+        "order_latency_p99_ms": _ms(_find(lat, "order_latency").get("p99")),
+        "ticks_not_applied": res["faults"][-1]["total"],
+        "reconnect_s": restart.get("reconnect_s"),
+        "rss_total_mb": sum(p["rss_max_mb"] for p in res["processes"]),
+        "cpu_total_pct": sum(p["cpu_pct"] for p in res["processes"]),
+    }
+
+
+# ---------- report ----------
+
+def _fmt(v, spec=".2f"):
+    if v is None:
+        return "n/a"
+    return f"{v:,}" if isinstance(v, int) else format(v, spec)
+
+
+def render(res, baseline=None):
+    cfg, env = res["config"], res["env"]
+    lines = [
+        "# Performance & Reliability Report",
+        "",
+        f"_Generated by `soak.py` at commit `{env['commit']}` on {env['date']}. Numbers below are measured, not"
+        " estimated; re-run the harness to refresh them._",
+        "",
+        "## 1. Overview",
+        "",
+        "The full stack (Gateway, OrderManager, OrderBook, Strategy) was started from `main.py` and run under load.",
+        "",
+        "| Setting | Value |",
+        "|---|---|",
+        f"| Measured duration | {cfg['duration_s']:.1f} s |",
+        f"| Symbols | {cfg['symbols']} |",
+        f"| Gateway tick interval | {cfg['tick_interval_s']:g} s ({cfg['symbols'] / cfg['tick_interval_s']:,.0f} ticks/s offered) |",
+        f"| News interval | {cfg['news_interval_s']:g} s |",
+        f"| Strategy processes | {cfg['strategies']} |",
+        f"| Gateway restart | {'at %g s' % cfg['restart_gateway_at_s'] if cfg['restart_gateway_at_s'] is not None else 'none'} |",
+        f"| Host | {env['platform']}, {env['cpus']} CPUs, Python {env['python']} |",
+        "",
+        "---",
+        "",
+        "## 2. Latency per hop",
+        "",
+        "Wall-clock differences between the timestamp a message was created with and the moment the next hop"
+        " handled it, merged across processes (each over its whole lifetime, warm-up included). Percentiles are histogram bucket upper bounds (1-2-5 ladder).",
+        "",
+        "| Hop | Samples | Mean (ms) | p50 (ms) | p90 (ms) | p99 (ms) | Max (ms) |",
+        "|---|---:|---:|---:|---:|---:|---:|",
+    ]
+    for r in res["latency"]:
+        if not r.get("count"):
+            lines.append(f"| {r['label']} | 0 | | | | | |")
+            continue
+        lines.append(f"| {r['label']} | {r['count']:,} | {_fmt(_ms(r['mean']), '.3f')} | {_fmt(_ms(r['p50']), '.3f')} | "
+                     f"{_fmt(_ms(r['p90']), '.3f')} | {_fmt(_ms(r['p99']), '.3f')} | {_fmt(_ms(r['max']), '.3f')} |")
+    lines += [
+        "",
+        "---",
+        "",
+        "## 3. Throughput",
+        "",
+        "Counter deltas over the measured window, summed across processes of each component.",
+        "",
+        "| Stage | Total | Per second |",
+        "|---|---:|---:|",
+    ]
+    for r in res["throughput"]:
+        lines.append(f"| {r['label']} | {r['total']:,.0f} | {r['per_s']:,.1f} |")
+    shm = res["shared_memory"] or {}
+    lines += ["", "---", "", "## 4. Shared Memory Footprint", ""]
+    if shm:
+        lines += [
+            f"`SharedPriceBook` `{shm['name']}`, layout version {shm['version']}, {shm['n_symbols']} symbols.",
+            "",
+            "| Part | Bytes |",
+            "|---|---:|",
+            f"| Header | {shm['header']:,} |",
+            f"| Symbol table | {shm['symbol_table']:,} |",
+            f"| Column table | {shm['column_table']:,} |",
+            f"| Alignment padding | {shm['padding']:,} |",
+            f"| Columns ({', '.join(shm['columns'])}) | {shm['column_data']:,} |",
+            f"| **Region size** | **{shm['size']:,}** |",
+            f"| Pages resident when fully touched | {shm['pages']} x {PAGE_SIZE} B |",
+        ]
+    else:
+        lines.append("The price book could not be attached during the run.")
+    lines += [
+        "",
+        "---",
+        "",
+        "## 5. Behavior Under Dropped Connections or Missing Data",
+        "",
+        "| Event | Count |",
+        "|---|---:|",
+    ]
+    for r in res["faults"]:
+        lines.append(f"| {r['label']} | {r['total']:,.0f} |")
+    restart = res.get("restart")
+    if restart:
+        lines += [
+            "",
+            f"The Gateway was terminated {restart['at_s']:.1f} s into the run and restarted {restart['down_s']:.1f} s later.",
+            "",
+            "| Measurement | Seconds |",
+            "|---|---:|",
+            f"| Gateway restarted -> first fresh tick in the book | {_fmt(restart.get('reconnect_s'))} |",
+            f"| Gateway killed -> first fresh tick in the book (outage) | {_fmt(restart.get('outage_s'))} |",
+        ]
+        rh = res.get("reconnect_histogram") or {}
+        if rh.get("count"):
+            lines.append(f"| OrderBook connection lost -> reconnected (max of {rh['count']}) | {rh['max']:.2f} |")
+        if restart.get("reconnect_s") is None:
+            lines.append("\nNo fresh tick reached the book before the harness gave up waiting.")
+    lines += [
+        "",
+        "---",
+        "",
+        "## 6. Process Resources",
+        "",
+        f"Sampled from `/proc` every {SAMPLE_INTERVAL:g} s. RSS includes mapped shared-memory pages.",
+        "",
+        "| Component | PID | Max RSS (MB) | Mean RSS (MB) | CPU (%) |",
+        "|---|---:|---:|---:|---:|",
+    ]
+    for p in res["processes"]:
+        lines.append(f"| {p['component']} | {p['pid']} | {p['rss_max_mb']:.1f} | {p['rss_mean_mb']:.1f} | {p['cpu_pct']:.1f} |")
+    lines += ["", "---", "", "## 7. Summary", ""]
+    head = res["headline"]
+    if baseline:
+        base = baseline["headline"]
+        lines += [f"Compared with commit `{baseline['env']['commit']}` ({baseline['env']['date']}).", "",
+                  "| Metric | This run | Baseline | Change |", "|---|---:|---:|---:|"]
+        for key, label, higher_better in HEADLINE:
+            cur, old = head.get(key), base.get(key)
+            change = ""
+            if cur is not None and old:
+                pct = 100.0 * (cur - old) / old
+                better = pct > 0 if higher_better else pct < 0
+                change = f"{pct:+.1f}%" + (" (better)" if better and abs(pct) >= 5 else " (worse)" if abs(pct) >= 5 else "")
+            lines.append(f"| {label} | {_fmt(cur)} | {_fmt(old)} | {change} |")
+    else:
+        lines += ["| Metric | Value |", "|---|---:|"]
+        for key, label, _ in HEADLINE:
+            lines.append(f"| {label} | {_fmt(head.get(key))} |")
+    return "\n".join(lines) + "\n"
+
+
+# ---------- run ----------
+
+def _book_info(book):
+    from shared_memory_utils import HEADER_SIZE, SYMBOL, COLUMN, COLUMNS
+    h = book.header
+    n, ncols, data = int(h["n_symbols"]), int(h["n_columns"]), int(h["data_offset"])
+    size = book.shm.size
+    return {
+        "name": book.name, "version": int(h["version"]), "n_symbols": n,
+        "header": HEADER_SIZE, "symbol_table": n * SYMBOL.itemsize, "column_table": ncols * COLUMN.itemsize,
+        "padding": data - HEADER_SIZE - n * SYMBOL.itemsize - ncols * COLUMN.itemsize,
+        "columns": [name for name, _ in COLUMNS], "column_data": size - data, "size": size,
+        "pages": -(-size // PAGE_SIZE),
+    }
+
+
+def _fresh_tick(book, since, timeout, sampler):
+    """Seconds from `since` until the book holds a tick stamped after it (None on timeout)."""
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        sampler.sample()
+        _, _, ts = book.snapshot()
+        if ts.max() > since:
+            return time.time() - since
+        time.sleep(0.01)
+    return None
+
+
+def run(args):
+    metrics_dir = tempfile.mkdtemp(prefix="soak-metrics-")
+    configure_env(args, metrics_dir)
+    import main as stack
+    from shared_memory_utils import SharedPriceBook
+
+    log_path = args.log or os.path.join(metrics_dir, "stack.log")
+    say = lambda msg: print(f"[Soak] {msg}", file=sys.stderr, flush=True)
+    say(f"{args.symbols} symbols @ {args.tick_interval:g}s, {args.strategies} strategies, "
+        f"{args.duration:g}s measured; component output -> {log_path}")
+
+    # children inherit fd 1, so their chatter lands in the log instead of the terminal
+    sys.stdout.flush()
+    saved_stdout = os.dup(1)
+    log = open(log_path, "w")
+    os.dup2(log.fileno(), 1)
+    sampler = ProcessSampler()
+    procs, book, restart = [], None, None
+    try:
+        procs = stack.start_stack(args.strategies)
+        book = SharedPriceBook.attach(timeout=10)
+        book_info = _book_info(book)
+        end_warmup = time.monotonic() + args.warmup
+        while time.monotonic() < end_warmup:
+            sampler.sample()
+            time.sleep(0.05)
+        sampler = ProcessSampler()   # CPU/RSS over the measured window only
+        sampler.sample(force=True)
+        before = read_metrics(metrics_dir)
+        t0 = time.monotonic()
+        while time.monotonic() - t0 < args.duration:
+            if args.restart_gateway is not None and restart is None and time.monotonic() - t0 >= args.restart_gateway:
+                say("restarting Gateway")
+                t_kill = time.time()
+                procs[0].terminate()
+                procs[0].join(5)
+                time.sleep(args.outage)
+                t_up = time.time()
+                procs[0] = stack.start_component("Gateway")
+                reconnect = _fresh_tick(book, t_up, max(15.0, args.duration), sampler)
+                restart = {"at_s": args.restart_gateway, "down_s": t_up - t_kill, "reconnect_s": reconnect,
+                           "outage_s": None if reconnect is None else reconnect + (t_up - t_kill)}
+                say(f"fresh ticks {reconnect if reconnect is None else round(reconnect, 2)}s after restart")
+            sampler.sample()
+            time.sleep(0.05)
+        sampler.sample(force=True)
+        time.sleep(SAMPLE_INTERVAL * 1.5)   # let every process dump once more
+        after = read_metrics(metrics_dir)
+        window = time.monotonic() - t0
+    finally:
+        if book is not None:
+            book.close()
+        for p in reversed(procs):
+            p.terminate()
+        for p in procs:
+            p.join(5)
+        sys.stdout.flush()
+        os.dup2(saved_stdout, 1)
+        os.close(saved_stdout)
+        log.close()
+
+    res = collect(args, before, after, window, sampler, book_info, restart)
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    with open(args.out, "w") as f:
+        f.write(render(res, baseline))
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(res, f, indent=1)
+    say(f"report -> {args.out}" + (f", raw results -> {args.json}" if args.json else ""))
+    return res
+
+
+if __name__ == "__main__":
+    run(parse_args())
@@ -1,27 +1,33 @@
 # strategy.py
 # ---------------------------------------------------
-# Reads latest prices from shared memory.
-# Connects to Gateway's news stream to receive sentiment.
-# Generates trading signals (MA crossover + news thresholds).
-# Currently: only prints order objects (no socket send yet).
+# Attaches to the shared price book by name (no layout guessing) and reads
+# prices and news sentiment from it lock-free (OrderBook ingests the news).
+# Runs every registered strategy plugin over a shared indicator cache
+# (default: MA crossover + news thresholds) and sends orders to OrderManager.
+# The decision loop runs on symbol ids and preallocated buffers / order
+# slots; orders are encoded into one reusable send buffer and logged from a
+# background thread.
 # ---------------------------------------------------
 
 import argparse
+import importlib
 import json
-import math
-import socket
+import os
+import queue
+import select
 import threading
 import time
-from collections import deque
-
 import numpy as np
-from multiprocessing import shared_memory
+
+import metrics
+import transport
+import tuning
+from shared_memory_utils import NEUTRAL_SENTIMENT, SharedPriceBook
 
 # --- Config ---
-NEWS_HOST = "localhost"
-NEWS_PORT = 7002
-ORDER_MANAGER_HOST = "localhost"
-ORDER_MANAGER_PORT = 7003
+# unix:///path hosts select a Unix domain socket (see transport.py)
+ORDER_MANAGER_HOST = os.getenv("ORDERMANAGER_HOST", "127.0.0.1")
+ORDER_MANAGER_PORT = int(os.getenv("ORDERMANAGER_PORT", "5003"))
 MESSAGE_DELIMITER = b"*"
 
 SHORT_WINDOW = 5
@@ -31,95 +37,432 @@ PRICE_POLL_INTERVAL = 0.2
 BULLISH_THRESHOLD = 60
 BEARISH_THRESHOLD = 40
 ORDER_QTY = 10
+POSITION_FOR = {"BUY": "LONG", "SELL": "SHORT"}
+SEND_BUFFER = 64 * 1024   # bytes; one cycle's orders go out in a single write
 
+# comma-separated names from STRATEGIES; extra plugin modules from STRATEGY_PLUGINS
+DEFAULT_STRATEGIES = os.getenv("STRATEGIES", "ma_news")
+STRATEGY_PLUGINS = os.getenv("STRATEGY_PLUGINS", "")
 
-def parse_args():
-    p = argparse.ArgumentParser(description="Strategy: signal generator (no order send)")
-    p.add_argument("--shm-name", required=True, help="SharedMemory name printed by OrderBook")
-    p.add_argument("--symbols", nargs="+", default=["AAPL", "MSFT", "AMZN"], help="Symbols order in shared memory")
-    return p.parse_args()
 
+def parse_args(argv=None):
+    p = argparse.ArgumentParser(description="Strategy: signal generator and order sender")
+    p.add_argument("--shm-name", default=None, help="Price book name (default: $PRICEBOOK_NAME or 'pricebook')")
+    p.add_argument("--symbols", nargs="+", default=None, help="Trade only these symbols (default: all in the book)")
+    p.add_argument("--strategies", default=DEFAULT_STRATEGIES, help="Comma-separated registered strategy names")
+    p.add_argument("--plugins", default=STRATEGY_PLUGINS, help="Comma-separated modules that register strategies")
+    return p.parse_args(argv)
 
-class NewsReceiver(threading.Thread):
-    """Background thread to receive sentiment from Gateway (7002)."""
 
-    def __init__(self, host, port):
-        super().__init__(daemon=True)
-        self.host = host
-        self.port = port
-        self._lock = threading.Lock()
-        self._latest_sentiment = 50
-        self._buffer = b""
-        self._stop = False
+def news_signal_from(score):
+    """Map sentiment integer to signal."""
+    if score > BULLISH_THRESHOLD:
+        return "BUY"
+    if score < BEARISH_THRESHOLD:
+        return "SELL"
+    return "HOLD"
 
-    def get_sentiment(self):
-        with self._lock:
-            return self._latest_sentiment
+# ---------- indicators ----------
 
-    def stop(self):
-        self._stop = True
+INDICATORS = {}
 
-    def _set_sentiment(self, val: int):
-        with self._lock:
-            self._latest_sentiment = val
 
-    def run(self):
-        while not self._stop:
-            try:
-                sock = socket.create_connection((self.host, self.port), timeout=5)
-                sock.settimeout(5)
-                print(f"[Strategy] Connected to news stream at {self.host}:{self.port}")
-                self._buffer = b""
-                while not self._stop:
-                    chunk = sock.recv(1024)
-                    if not chunk:
-                        raise ConnectionResetError
-                    self._buffer += chunk
-                    parts = self._buffer.split(MESSAGE_DELIMITER)
-                    self._buffer = parts[-1]
-                    for part in parts[:-1]:
-                        txt = part.decode(errors="ignore").strip()
-                        if not txt:
-                            continue
-                        try:
-                            left, right = txt.split(",", 1)
-                            score = int(right)
-                            score = max(0, min(100, score))
-                            self._set_sentiment(score)
-                        except Exception:
-                            continue
-            except (ConnectionRefusedError, TimeoutError, OSError, ConnectionResetError):
-                print("[Strategy] News stream unavailable. Reconnecting in 2s...")
-                time.sleep(2)
-            except Exception as e:
-                print("[Strategy] News recv error:", e)
-                time.sleep(1)
-
-
-def compute_ma_signal(history: deque):
-    """Return 'BUY' if short MA > long MA, else 'SELL'. Equal ignored."""
-    if len(history) < LONG_WINDOW:
+def register_indicator(name):
+    """Register fn(cache, sym, *params) as a cached indicator."""
+    def deco(fn):
+        INDICATORS[name] = fn
+        return fn
+    return deco
+
+
+@register_indicator("prices")
+def _prices(cache, sym):
+    i = cache.ids[sym]
+    return cache.window(i, cache.count[i])
+
+
+@register_indicator("sma")
+def _sma(cache, sym, window):
+    i = cache.ids[sym]
+    if cache.count[i] < window:
         return None
-    arr = np.fromiter(history, dtype=float)
-    s_ma = arr[-SHORT_WINDOW:].mean()
-    l_ma = arr[-LONG_WINDOW:].mean()
-    return "BUY" if s_ma > l_ma else "SELL"
+    return cache.window_sum(i, window) / window
+
+
+class _Memo:
+    """One indicator's value per symbol id, and whether it is still current."""
+    __slots__ = ("values", "fresh")
+
+    def __init__(self, n):
+        self.values = [None] * n
+        self.fresh = [False] * n
+
+
+class IndicatorCache:
+    """
+    Per-symbol price history plus memoized indicators, both indexed by
+    symbol id. History lives in preallocated ring buffers; a new price for
+    a symbol marks its memoized values stale, so each indicator is computed
+    at most once per tick and every strategy asking for it shares the
+    result. Pushing a price and reading an SMA build no arrays or
+    containers.
+    """
+
+    def __init__(self, symbols, lookback=LONG_WINDOW):
+        self.symbols = list(symbols)
+        self.ids = {sym: i for i, sym in enumerate(self.symbols)}
+        n = len(self.symbols)
+        self.lookback = lookback
+        # each price is written twice (j and j + lookback) so the last k are one contiguous slice
+        self._ring = np.full((n, 2 * lookback), np.nan)
+        # running totals, one slot per push modulo lookback + 1: a k-price sum is newest - k back
+        self._sums = np.zeros((n, lookback + 1))
+        self._head = [0] * n         # next ring position, < lookback
+        self._slot = [0] * n         # newest running total, <= lookback
+        self.count = [0] * n         # prices held, up to lookback
+        self._memo = {}              # name -> {params: _Memo}
+        self._memos = []
+        self.computed = 0            # indicator values computed (not served from the memo)
+
+    def push(self, i, px) -> bool:
+        """Append a new price for symbol id `i`; returns False (nothing invalidated) if unchanged."""
+        h, size = self._head[i], self.lookback
+        ring, sums = self._ring, self._sums
+        if self.count[i] and ring.item(i, h - 1 + size) == px:
+            return False
+        ring[i, h] = px
+        ring[i, h + size] = px
+        self._head[i] = h + 1 if h + 1 < size else 0
+        s = self._slot[i]
+        nxt = s + 1 if s < size else 0
+        sums[i, nxt] = sums.item(i, s) + px
+        self._slot[i] = nxt
+        if nxt == size:
+            # once per lap, shift the totals back near zero so rounding doesn't grow with uptime
+            row = sums[i]
+            row -= row[0]
+        if self.count[i] < size:
+            self.count[i] += 1
+        for memo in self._memos:
+            memo.fresh[i] = False
+        return True
+
+    def window(self, i, k):
+        """View of symbol id `i`'s last `k` prices, oldest first (valid until its next push)."""
+        end = self._head[i] + self.lookback
+        return self._ring[i, end - k:end]
+
+    def window_sum(self, i, k):
+        """Sum of symbol id `i`'s last `k` prices (k <= count[i]) from the running totals."""
+        s = self._slot[i]
+        back = (s - k) % (self.lookback + 1)
+        return self._sums.item(i, s) - self._sums.item(i, back)
+
+    def get(self, sym, name, *params):
+        i = self.ids[sym]
+        by_params = self._memo.get(name)
+        if by_params is None:
+            by_params = self._memo[name] = {}
+        memo = by_params.get(params)
+        if memo is None:
+            memo = by_params[params] = _Memo(len(self.symbols))
+            self._memos.append(memo)
+        if memo.fresh[i]:
+            return memo.values[i]
+        val = INDICATORS[name](self, sym, *params)
+        memo.values[i] = val
+        memo.fresh[i] = True
+        self.computed += 1
+        return val
+
+
+# ---------- strategy plugins ----------
+
+STRATEGIES = {}
+
+
+def register_strategy(name):
+    """Class decorator: make a BaseStrategy subclass selectable by name."""
+    def deco(cls):
+        cls.name = name
+        STRATEGIES[name] = cls
+        return cls
+    return deco
+
+
+class BaseStrategy:
+    """
+    Plugin interface. `decide` returns "BUY", "SELL" or None for one symbol;
+    it is only called when that symbol's price changed, or when its sentiment
+    changed and `uses_sentiment` is set. The engine tracks positions.
+    """
+    name = "base"
+    lookback = LONG_WINDOW
+    uses_sentiment = False
+    qty = ORDER_QTY
+
+    def __init__(self, symbols):
+        self.position = {sym: None for sym in symbols}
+
+    def decide(self, sym, ind: IndicatorCache, sentiment):
+        raise NotImplementedError
+
+
+@register_strategy("ma_news")
+class MACrossoverNews(BaseStrategy):
+    """MA crossover confirmed by news sentiment (the original rule)."""
+    uses_sentiment = True
+
+    def decide(self, sym, ind, sentiment):
+        s_ma = ind.get(sym, "sma", SHORT_WINDOW)
+        l_ma = ind.get(sym, "sma", LONG_WINDOW)
+        if s_ma is None or l_ma is None:
+            return None
+        psig = "BUY" if s_ma > l_ma else "SELL"
+        return psig if news_signal_from(sentiment) == psig else None
+
+
+@register_strategy("ma_cross")
+class MACrossover(BaseStrategy):
+    """Plain MA crossover; shares its SMAs with ma_news through the cache."""
+
+    def decide(self, sym, ind, sentiment):
+        s_ma = ind.get(sym, "sma", SHORT_WINDOW)
+        l_ma = ind.get(sym, "sma", LONG_WINDOW)
+        if s_ma is None or l_ma is None:
+            return None
+        return "BUY" if s_ma > l_ma else "SELL"
+
+
+def load_strategies(names, symbols, plugins=""):
+    for mod in filter(None, (m.strip() for m in plugins.split(","))):
+        importlib.import_module(mod)
+    out = []
+    for n in filter(None, (n.strip() for n in names.split(","))):
+        if n not in STRATEGIES:
+            raise ValueError(f"unknown strategy {n!r}; registered: {sorted(STRATEGIES)}")
+        out.append(STRATEGIES[n](symbols))
+    return out
+
+
+class StrategyEngine:
+    """
+    Feeds price snapshots into the cache and runs only the affected strategies.
+    It works on symbol ids and preallocated buffers: on_arrays() takes the
+    cycle's prices and sentiment in self.symbols order, decide_into() writes
+    the wanted orders into preallocated OrderSlots.
+    """
+
+    def __init__(self, strategies, symbols):
+        self.strategies = strategies
+        self.symbols = list(symbols)
+        self.ids = {sym: i for i, sym in enumerate(self.symbols)}
+        lookback = max((s.lookback for s in strategies), default=LONG_WINDOW)
+        self.indicators = IndicatorCache(self.symbols, lookback)
+        n = len(self.symbols)
+        self._last_px = np.full(n, np.nan)
+        self._last_sent = np.full(n, np.nan)
+        self._changed = np.zeros(n, bool)     # price changed this cycle
+        self._either = np.zeros(n, bool)      # price or sentiment changed
+        self._valid = np.zeros(n, bool)
+
+    def on_arrays(self, px, sent):
+        """
+        px / sent: arrays in self.symbols order. Pushes changed prices into the
+        cache and marks what moved; returns False if nothing did.
+        """
+        np.equal(px, px, out=self._valid)                     # skip NaN
+        np.not_equal(px, self._last_px, out=self._changed)
+        np.logical_and(self._changed, self._valid, out=self._changed)
+        np.not_equal(sent, self._last_sent, out=self._either)
+        np.logical_or(self._either, self._changed, out=self._either)
+        np.copyto(self._last_px, px, where=self._valid)
+        np.copyto(self._last_sent, sent)
+        if not self._either.any():
+            return False
+        push, changed = self.indicators.push, self._changed
+        for i in range(len(self.symbols)):
+            if changed[i]:
+                push(i, px.item(i))
+        return True
+
+    def decide_into(self, sent, slots):
+        """
+        Run the strategies for the symbols on_arrays() marked and fill `slots`
+        (preallocated OrderSlots) with the new positions they want. Returns
+        how many slots were filled.
+        """
+        k = 0
+        symbols, ind = self.symbols, self.indicators
+        for strat in self.strategies:
+            mask = self._either if strat.uses_sentiment else self._changed
+            position = strat.position
+            for i in range(len(symbols)):
+                if not mask[i]:
+                    continue
+                sym = symbols[i]
+                side = strat.decide(sym, ind, sent.item(i))
+                want = POSITION_FOR.get(side)
+                if want is not None and position[sym] != want:
+                    slot = slots[k]
+                    slot.strategy, slot.sym_id, slot.side = strat, i, side
+                    k += 1
+        return k
+
+
+# ---------- order hot path ----------
+
+class OrderSlot:
+    """One preallocated order; the decision loop overwrites it instead of building a dict."""
+    __slots__ = ("strategy", "sym_id", "side", "price", "sentiment", "ts", "tick_ts")
+
+    def __init__(self):
+        self.strategy = None
+        self.sym_id = -1
+        self.side = None
+        self.price = self.sentiment = self.ts = self.tick_ts = 0.0
+
+
+class OrderEncoder:
+    """
+    Writes framed orders into one reusable send buffer. Everything except
+    price, sentiment and timestamp is pre-encoded per (strategy, side, symbol),
+    and the output is byte-for-byte what json.dumps would produce, so
+    OrderManager and tradelog.py read it unchanged.
+    """
+
+    def __init__(self, symbols, strategies, size=SEND_BUFFER):
+        self.buf = bytearray(size)
+        self.view = memoryview(self.buf)
+        self.n = 0
+        self._fmt = {}
+        for strat in strategies:
+            self._fmt[strat] = {side: [self._template(strat, sym, side) for sym in symbols] for side in POSITION_FOR}
+
+    @staticmethod
+    def _template(strat, sym, side):
+        head = json.dumps({"type": "order", "symbol": sym, "side": side, "qty": strat.qty})[:-1].replace("%", "%%")
+        tail = json.dumps(strat.name).replace("%", "%%")
+        return (head + ', "price": %r, "sentiment": %r, "strategy": ' + tail + ', "timestamp": %r}').encode() \
+            + MESSAGE_DELIMITER
+
+    def add(self, slot):
+        """Append one order; returns the encoded frame (False if the buffer is full)."""
+        frame = self._fmt[slot.strategy][slot.side][slot.sym_id] % (slot.price, slot.sentiment, slot.ts)
+        end = self.n + len(frame)
+        if end > len(self.buf):
+            return False
+        self.view[self.n:end] = frame
+        self.n = end
+        return frame
+
+    def flush(self, sock):
+        if self.n:
+            n, self.n = self.n, 0
+            sock.sendall(self.view[:n])
+
+
+class OrderLog(threading.Thread):
+    """Prints sent orders from a queue so the decision loop never formats or writes to stdout."""
+
+    def __init__(self):
+        super().__init__(name="Strategy-orderlog", daemon=True)
+        self.queue = queue.SimpleQueue()
 
+    def run(self):
+        while True:
+            frame = self.queue.get()
+            print(f"[Strategy] Sent order: {frame[:-len(MESSAGE_DELIMITER)].decode()}")
+
+
+class DecisionLoop:
+    """
+    The per-cycle Strategy work on preallocated state: seqlock snapshots land
+    in fixed buffers, symbols are ids (column indices into the book), orders
+    are OrderSlots encoded into one send buffer, and logging goes through
+    OrderLog. A cycle where the book didn't change returns immediately.
+    """
+
+    def __init__(self, book, symbols, engine, order_log=None):
+        self.symbols = list(symbols)
+        self.engine = engine
+        self.px = np.empty(len(self.symbols))
+        self.tick_ts = np.empty(len(self.symbols))
+        self.sent = np.empty(len(self.symbols))
+        self.market = NEUTRAL_SENTIMENT
+        self.slots = [OrderSlot() for _ in range(len(engine.strategies) * len(self.symbols))]
+        self.pending = 0
+        self.encoder = OrderEncoder(self.symbols, engine.strategies)
+        self.order_log = order_log
+        self.attach(book)
+
+    def attach(self, book):
+        """(Re)point the loop at a book; the next cycle re-reads prices and sentiment."""
+        self.book = book
+        self.cols = np.array([book.index[s] for s in self.symbols], np.intp)
+        self._book_px = np.empty(book.n)
+        self._book_ts = np.empty(book.n)
+        self._book_sent = np.empty(book.n)
+        self.seen_seq = self.seen_news = -1
+
+    def cycle(self):
+        """Take a snapshot if the book moved and decide; returns the number of orders encoded."""
+        book = self.book
+        if book.seq == self.seen_seq:
+            return 0
+        self.seen_seq = book.snapshot(self._book_px, self._book_ts)[0]
+        np.take(self._book_px, self.cols, out=self.px)
+        np.take(self._book_ts, self.cols, out=self.tick_ts)
+        if book.news_seq != self.seen_news:   # most cycles are price-only
+            self.seen_news, self.market, _ = book.sentiment(self._book_sent)
+            np.take(self._book_sent, self.cols, out=self.sent)
+        if not self.engine.on_arrays(self.px, self.sent):
+            return 0
+        k = self.engine.decide_into(self.sent, self.slots)
+        if k:
+            now = time.time()
+            for j in range(k):
+                slot = self.slots[j]
+                i = slot.sym_id
+                slot.price = self.px.item(i)
+                slot.sentiment = self.sent.item(i)
+                slot.tick_ts = self.tick_ts.item(i)
+                slot.ts = now
+            self.pending = k
+        return k
+
+    def send(self, sock):
+        """Encode and send the pending orders in one write, then book them as positions."""
+        k, self.pending = self.pending, 0
+        frames = []
+        for j in range(k):
+            frame = self.encoder.add(self.slots[j])
+            if frame is False:          # buffer full: ship what we have and carry on
+                self.encoder.flush(sock)
+                frame = self.encoder.add(self.slots[j])
+            frames.append(frame)
+        self.encoder.flush(sock)
+        for j in range(k):
+            slot = self.slots[j]
+            slot.strategy.position[self.symbols[slot.sym_id]] = POSITION_FOR[slot.side]
+            metrics.incr("orders")
+            metrics.observe("decision_latency", slot.ts - slot.tick_ts)
+            if self.order_log is not None:
+                self.order_log.queue.put(frames[j])
+        return k
+
+    def describe(self):
+        """Status line for the periodic print (off the per-cycle path)."""
+        desc = ", ".join(f"{s}={p:.2f}" for s, p in zip(self.symbols, self.px.tolist()))
+        return f"sentiment={self.market:g} | {desc}"
 
-def news_signal_from(score: int):
-    """Map sentiment integer to signal."""
-    if score > BULLISH_THRESHOLD:
-        return "BUY"
-    if score < BEARISH_THRESHOLD:
-        return "SELL"
-    return "HOLD"
 
 def connect_order_manager():
     """Try to connect to OrderManager, retry on failure."""
     while True:
         try:
-            sock = socket.create_connection((ORDER_MANAGER_HOST, ORDER_MANAGER_PORT))
-            print(f"[Strategy] Connected to OrderManager at {ORDER_MANAGER_HOST}:{ORDER_MANAGER_PORT}")
+            sock = transport.connect(ORDER_MANAGER_HOST, ORDER_MANAGER_PORT)
+            print(f"[Strategy] Connected to OrderManager at {transport.describe(ORDER_MANAGER_HOST, ORDER_MANAGER_PORT)}")
             sock.settimeout(5)
             return sock
         except (ConnectionRefusedError, OSError):
@@ -127,121 +470,154 @@ def connect_order_manager():
             time.sleep(3)
 
 
-def send_order(sock, ord_obj):
-    """Send serialized order over TCP with delimiter."""
-    msg = json.dumps(ord_obj).encode() + MESSAGE_DELIMITER
-    sock.sendall(msg)
-
-
-def main():
-    args = parse_args()
-    symbols = args.symbols
-
-    dtype = np.dtype([("symbol", "U8"), ("price", "f8")])
-    shm = shared_memory.SharedMemory(name=args.shm_name)
-    shared_array = np.ndarray((len(symbols),), dtype=dtype, buffer=shm.buf)
+def wait_for_book(book, seen_seq, timeout, busy=False):
+    """
+    Pause until the next cycle. Sleeping records how late the wakeup was
+    (wakeup_jitter); busy-polling spins on the book's seqlock counter until a
+    write lands (or timeout) and records how long the wait took (poll_wait).
+    """
+    start = time.perf_counter()
+    if busy:
+        while book.seq == seen_seq and time.perf_counter() - start < timeout:
+            pass
+        metrics.observe("poll_wait", time.perf_counter() - start)
+    else:
+        time.sleep(timeout)
+        metrics.observe("wakeup_jitter", time.perf_counter() - start - timeout)
 
-    history = {sym: deque(maxlen=LONG_WINDOW) for sym in symbols}
-    position = {sym: None for sym in symbols}
 
-    news = NewsReceiver(NEWS_HOST, NEWS_PORT)
-    news.start()
+def reply_poller(sock):
+    """A reusable readiness check for drain_replies (None where poll() is unavailable)."""
+    if not hasattr(select, "poll"):
+        return None
+    poller = select.poll()
+    poller.register(sock, select.POLLIN)
+    return poller
+
+
+def drain_replies(sock, buf, engine, poller=None):
+    """
+    Read whatever OrderManager sent back without blocking. A reject frees the
+    position the sending strategy had assumed, so it may try again later.
+    Returns the unparsed tail of the buffer.
+    """
+    got = False
+    while poller.poll(0) if poller is not None else select.select([sock], [], [], 0)[0]:
+        data = sock.recv(4096)
+        if not data:
+            raise ConnectionResetError
+        buf += data
+        got = True
+    if not got:
+        return buf
+    parts = buf.split(MESSAGE_DELIMITER)
+    by_name = {s.name: s for s in engine.strategies}
+    for raw in parts[:-1]:
+        try:
+            msg = json.loads(raw.decode())
+        except ValueError:
+            metrics.incr("malformed_replies")
+            continue
+        if not isinstance(msg, dict) or msg.get("type") != "reject":
+            continue
+        metrics.incr("orders_rejected")
+        print(f"[Strategy] Order rejected: {msg.get('side')} {msg.get('symbol')} ({msg.get('reason')})")
+        strat = by_name.get(msg.get("strategy"))
+        if strat is not None and msg.get("symbol") in strat.position:
+            strat.position[msg["symbol"]] = None
+    return parts[-1]
+
+
+def check_writer(book):
+    """
+    Return a usable book: the same one while its writer is alive, a freshly
+    attached one if OrderBook was restarted, or None while there is no writer.
+    """
+    if book.writer_alive():
+        return book
+    try:
+        fresh = SharedPriceBook.attach(book.name, timeout=0)
+    except (FileNotFoundError, ValueError):
+        return None
+    if fresh.writer_pid != book.writer_pid and fresh.writer_alive() and fresh.symbols == book.symbols:
+        print(f"[Strategy] Re-attached to {book.name} (writer pid {fresh.writer_pid})")
+        metrics.incr("book_reattaches")
+        book.close()
+        return fresh
+    fresh.close()
+    return None
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    metrics.start("strategy")
+    busy = tuning.apply("strategy").get("busy_poll", False)
+
+    book = SharedPriceBook.attach(args.shm_name, timeout=30)
+    symbols = args.symbols or book.symbols
+    missing = set(symbols) - set(book.symbols)
+    if missing:
+        raise SystemExit(f"[Strategy] symbols not in price book {book.name}: {sorted(missing)}")
+    print(f"[Strategy] Attached to {book.name}: {book.symbols} (writer pid {book.writer_pid})")
+
+    engine = StrategyEngine(load_strategies(args.strategies, symbols, args.plugins), symbols)
+    print(f"[Strategy] Running: {', '.join(s.name for s in engine.strategies)}")
+    order_log = OrderLog()
+    order_log.start()
+    loop = DecisionLoop(book, symbols, engine, order_log)
 
-    # 🟡 Temporarily disable order sending: not connecting to OrderManager, just printing results
     order_sock = connect_order_manager()
+    poller = reply_poller(order_sock)
+    reply_buf = b""
 
     try:
         last_print = 0.0
         while True:
-            # double snapshot
-            snap1 = np.copy(shared_array)
-            time.sleep(0.001)
-            snap2 = np.copy(shared_array)
-            snap = snap1 if np.array_equal(snap1, snap2) else np.copy(shared_array)
-
-            sym_to_price = {}
-            for rec in snap:
-                sym = str(rec["symbol"])
-                px = float(rec["price"])
-                history[sym].append(px)
-                sym_to_price[sym] = px
-
-            sentiment = news.get_sentiment()
-            nsig = news_signal_from(sentiment)
-
-            for sym in symbols:
-                psig = compute_ma_signal(history[sym])
-                if psig is None:
-                    continue
-
-                action = None
-                if nsig == "BUY" and psig == "BUY":
-                    action = "BUY"
-                elif nsig == "SELL" and psig == "SELL":
-                    action = "SELL"
-
-                if action == "BUY" and position[sym] != "LONG":
-                    ord_obj = {
-                        "type": "order",
-                        "symbol": sym,
-                        "side": "BUY",
-                        "qty": ORDER_QTY,
-                        "price": float(sym_to_price.get(sym, math.nan)),
-                        "sentiment": sentiment,
-                        "timestamp": time.time(),
-                    }
-                    # 🟢 Temporarily print order object only (not sent)
-                    
-                    try:
-                        send_order(order_sock, ord_obj)
-                        print(f"[Strategy] Sent BUY order: {ord_obj}")
-                        position[sym] = "LONG"
-                    except (BrokenPipeError, ConnectionResetError, OSError):
-                        print("[Strategy] Lost connection to OrderManager. Reconnecting...")
-                        order_sock.close()
-                        order_sock = connect_order_manager()
-                    
-
-                elif action == "SELL" and position[sym] != "SHORT":
-                    ord_obj = {
-                        "type": "order",
-                        "symbol": sym,
-                        "side": "SELL",
-                        "qty": ORDER_QTY,
-                        "price": float(sym_to_price.get(sym, math.nan)),
-                        "sentiment": sentiment,
-                        "timestamp": time.time(),
-                    }
-                    # 🟢 Temporarily print order object only (not sent)
-                    try:
-                        send_order(order_sock, ord_obj)
-                        print(f"[Strategy] Sent SELL order: {ord_obj}")
-                        position[sym] = "SHORT"
-                    except (BrokenPipeError, ConnectionResetError, OSError):
-                        print("[Strategy] Lost connection to OrderManager. Reconnecting...")
-                        order_sock.close()
-                        order_sock = connect_order_manager()
+            cycle_start = time.perf_counter()
+            live = check_writer(loop.book)
+            if live is None:
+                metrics.incr("stale_book_cycles")
+                if cycle_start - last_print > 2.0:
+                    last_print = cycle_start
+                    print(f"[Strategy] Price book writer (pid {loop.book.writer_pid}) is gone or stale; not trading")
+                time.sleep(PRICE_POLL_INTERVAL)
+                continue
+            if live is not loop.book:
+                loop.attach(live)
 
-            now = time.time()
-            if now - last_print > 2.0:
-                last_print = now
-                desc = ", ".join(f"{s}={sym_to_price.get(s, float('nan')):.2f}" for s in symbols)
-                print(f"[Strategy] sentiment={sentiment} | {desc}")
-
-            time.sleep(PRICE_POLL_INTERVAL)
+            try:
+                reply_buf = drain_replies(order_sock, reply_buf, engine, poller)
+                # snapshot + decide on preallocated buffers; only firing orders allocate
+                if loop.cycle():
+                    loop.send(order_sock)
+            except OSError:   # reset, broken pipe, timeout
+                print("[Strategy] Lost connection to OrderManager. Reconnecting...")
+                metrics.incr("ordermanager_reconnects")
+                loop.pending = 0
+                order_sock.close()
+                order_sock = connect_order_manager()
+                poller = reply_poller(order_sock)
+                reply_buf = b""
+
+            metrics.incr("cycles")
+            metrics.gauge("indicators_computed", engine.indicators.computed)
+            metrics.observe("cycle_time", time.perf_counter() - cycle_start)
+            if cycle_start - last_print > 2.0:
+                last_print = cycle_start
+                print(f"[Strategy] {loop.describe()}")
+            wait_for_book(loop.book, loop.seen_seq, PRICE_POLL_INTERVAL, busy)
 
     except KeyboardInterrupt:
         print("\n[Strategy] Shutting down.")
     finally:
-        news.stop()
-        shm.close()
+        loop.book.close()
         try:
             order_sock.close()
         except Exception:
             pass
 
 def run_strategy():
-    main()
+    main([])   # don't parse the launcher's argv
 
 
 if __name__ == "__main__":
@@ -0,0 +1,95 @@
+# tests/test_gateway_backpressure.py
+import json
+import socket
+import time
+
+import pytest
+
+
+@pytest.fixture
+def gateway():
+    # imported lazily so module-level config picks up the env from conftest
+    return pytest.importorskip("gateway")
+
+
+def _frames(gateway, keys):
+    return [(k, f"{k}{i}".encode() + gateway.MESSAGE_DELIMITER, float(i)) for i, k in enumerate(keys)]
+
+
+def _queued(sub):
+    return [item[1] for item in sub.queue]
+
+
+@pytest.mark.parametrize("policy", ["conflate", "drop_oldest", "disconnect"])
+def test_overflow_policies(gateway, policy):
+    a, b = socket.socketpair()
+    try:
+        sub = gateway.Subscriber(a, "t", policy=policy, maxlen=4)
+        for key, frame, ts in _frames(gateway, ["AAPL", "MSFT", "AAPL", "MSFT", "AAPL"]):
+            sub.put(key, frame, ts)
+        if policy == "conflate":
+            # latest AAPL/MSFT survive in time order, plus the new frame
+            assert _queued(sub) == [b"AAPL2*", b"MSFT3*", b"AAPL4*"]
+        elif policy == "drop_oldest":
+            assert _queued(sub) == [b"MSFT1*", b"AAPL2*", b"MSFT3*", b"AAPL4*"]
+            assert sub.dropped == 1
+        else:
+            assert sub.closed
+    finally:
+        a.close(); b.close()
+
+
+@pytest.mark.timeout(10)
+def test_idle_subscriber_gets_heartbeat_and_batches_are_flushed(gateway):
+    a, b = socket.socketpair()
+    try:
+        sub = gateway.Subscriber(a, "hb", heartbeat=0.05).start()
+        b.settimeout(2)
+        first = b.recv(4096).split(gateway.MESSAGE_DELIMITER)[0]
+        assert json.loads(first)["type"] == "heartbeat"
+
+        sub.put("AAPL", b'{"type":"price"}*', time.time())
+        data = b""
+        while b'{"type":"price"}*' not in data:
+            data += b.recv(4096)
+    finally:
+        sub.close(); b.close()
+
+
+@pytest.mark.timeout(10)
+def test_stalled_client_does_not_block_producer(gateway):
+    a, b = socket.socketpair()
+    try:
+        sub = gateway.Subscriber(a, "slow", policy="drop_oldest", maxlen=8, send_timeout=0.5).start()
+        frame = b"x" * 4096 + gateway.MESSAGE_DELIMITER
+        t0 = time.perf_counter()
+        for _ in range(2000):   # far more than the socket buffer; b never reads
+            sub.put("AAPL", frame, time.time())
+        assert time.perf_counter() - t0 < 1.0
+        assert sub.depth() <= 8
+    finally:
+        sub.close(); b.close()
+
+
+def test_price_generator_blocks_and_frames(gateway):
+    np = pytest.importorskip("numpy")
+    gen = gateway.PriceGenerator(["AAPL", "MSFT"], step=0.2, block=4, seed=1)
+    path = np.array([gen.tick().copy() for _ in range(10)])   # crosses two block refills
+    assert path.shape == (10, 2)
+    assert np.all(np.abs(np.diff(path, axis=0)) <= 0.2 + 1e-12)
+
+    frames = gen.frames(123.5)
+    msgs = [json.loads(f.rstrip(gateway.MESSAGE_DELIMITER)) for f in frames]
+    assert [m["sym"] for m in msgs] == ["AAPL", "MSFT"]
+    assert msgs[0]["px"] == pytest.approx(path[-1, 0], abs=1e-4) and msgs[0]["ts"] == 123.5
+
+
+def test_price_generator_correlated_moves(gateway):
+    np = pytest.importorskip("numpy")
+    gen = gateway.PriceGenerator(["A", "B", "C"], corr=0.9, block=512, seed=2)
+    steps = []
+    for _ in range(4000):
+        before = gen.prices.copy()
+        steps.append(gen.tick() - before)
+    c = np.corrcoef(np.array(steps).T)
+    assert c[0, 1] > 0.8 and c[1, 2] > 0.8
@@ -0,0 +1,42 @@
+# tests/test_metrics.py
+import json
+
+import pytest
+
+metrics = pytest.importorskip("metrics")
+
+
+def test_registry_counters_rates_and_histograms():
+    reg = metrics.Registry("test")
+    reg.incr("frames_parsed", 3)
+    reg.incr("malformed_frames")
+    reg.gauge("queue_depth", 7)
+    for v in (0.0001, 0.0002, 0.003):
+        reg.observe("tick_latency", v)
+
+    snap = reg.snapshot()
+    json.dumps(snap)  # must be serializable for the dump file / stats socket
+    assert snap["counters"] == {"frames_parsed": 3, "malformed_frames": 1}
+    assert snap["gauges"]["queue_depth"] == 7
+    h = snap["histograms"]["tick_latency"]
+    assert h["count"] == 3
+    assert h["min"] == pytest.approx(0.0001) and h["max"] == pytest.approx(0.003)
+    assert 0.0001 <= h["p50"] <= 0.0002 and h["p99"] >= 0.003
+    assert h["jitter"] == pytest.approx(h["p99"] - h["p50"]) and h["stdev"] > 0
+
+
+def test_orderbook_counts_malformed_frames_instead_of_hiding_them():
+    ob = pytest.importorskip("orderbook")
+    from shared_memory_utils import SharedPriceBook
+
+    book = SharedPriceBook.create(["AAPL", "MSFT"])
+    try:
+        reg = metrics.start("orderbook-test")
+        ob.update_prices(b'{"type":"price","sym":"AAPL","px":101.5,"ts":0}*MSFT,99.5*garbage*'
+                         b'{"type":"price","sym":["AAPL"],"px":1}*', book)
+        assert [book.read("AAPL"), book.read("MSFT")] == [101.5, 99.5]
+        assert reg.get("frames_parsed") == 2
+        assert reg.get("ticks") == 2
+        assert reg.get("malformed_frames") == 2
+    finally:
+        book.close(); book.unlink()
@@ -0,0 +1,76 @@
+# tests/test_multicast.py
+import socket
+import threading
+
+import pytest
+
+from conftest import find_free_port
+
+multicast = pytest.importorskip("multicast")
+
+GROUP = "239.255.0.77"
+
+
+def _pair():
+    port = find_free_port()
+    pub = multicast.MulticastPublisher(GROUP, port, iface="127.0.0.1", history=4)
+    srv = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    srv.bind(("127.0.0.1", 0))
+    srv.listen(8)
+    threading.Thread(target=pub.serve_recovery, args=(srv,), daemon=True).start()
+    try:
+        rcv = multicast.MulticastReceiver(GROUP, port, srv.getsockname(), iface="127.0.0.1", timeout=2)
+    except OSError as e:
+        pub.close()
+        pytest.skip(f"multicast unavailable on loopback: {e}")
+    return pub, rcv, srv
+
+
+@pytest.mark.timeout(10)
+def test_multicast_delivers_in_sequence():
+    pub, rcv, srv = _pair()
+    try:
+        # junk on the group is ignored, not fatal to the iterator
+        for junk in (b"[1, 2]", b'{"seq": null}', b"{}", b"not json"):
+            pub.sock.sendto(junk, (GROUP, pub.port))
+        for i in range(3):
+            pub.publish({"type": "price", "sym": "AAPL", "px": 100.0 + i, "ts": 0.0})
+        it = iter(rcv)
+        got = [next(it) for _ in range(3)]
+        assert [m["seq"] for m in got] == [1, 2, 3]
+        assert got[-1]["px"] == 102.0
+    finally:
+        rcv.close(); pub.close(); srv.close()
+
+
+@pytest.mark.timeout(10)
+def test_recovery_retransmit_and_snapshot_fallback():
+    pub, rcv, srv = _pair()
+    try:
+        for i in range(6):
+            pub.publish({"type": "price", "sym": "MSFT", "px": float(i), "ts": 0.0})
+        # seqs 3..6 are still in the 4-deep history
+        msgs = rcv.recover(3, 5)
+        assert [m["seq"] for m in msgs] == [3, 4, 5]
+        # seq 1 has been evicted -> snapshot
+        msgs = rcv.recover(1, 2)
+        assert msgs[0]["type"] == "snapshot"
+        assert msgs[0]["seq"] == 6 and msgs[0]["prices"] == {"MSFT": 5.0}
+        assert rcv.expected == 7
+    finally:
+        rcv.close(); pub.close(); srv.close()
+
+
+@pytest.mark.timeout(10)
+def test_malformed_recovery_request_is_skipped():
+    pub, rcv, srv = _pair()
+    try:
+        pub.publish({"type": "price", "sym": "AAPL", "px": 1.0, "ts": 0.0})
+        # the bad frames are dropped; the same connection still answers the snapshot
+        rcv._request({"type": "retransmit", "from": "x"})
+        rcv._request({"type": "retransmit"})
+        rcv._request([1, 2])
+        msgs = rcv.recover(0, 0)
+        assert msgs[0]["type"] == "snapshot" and msgs[0]["prices"] == {"AAPL": 1.0}
+    finally:
+        rcv.close(); pub.close(); srv.close()
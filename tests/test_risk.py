@@ -0,0 +1,80 @@
+# tests/test_risk.py
+import json
+import socket
+import time
+
+import pytest
+
+risk = pytest.importorskip("risk")
+
+
+def _engine(**kw):
+    eng = risk.RiskEngine(["AAPL", "MSFT"], max_position=30, max_notional=5000,
+                          max_rate=1000, burst=1000, collar=0.05, **kw)
+    return eng
+
+
+def test_limits_and_reason_codes():
+    eng = _engine()
+    assert eng.check("AAPL", "BUY", 10, 100.0, 0.0) == risk.OK
+    assert eng.check("TSLA", "BUY", 10, 100.0, 0.0) == risk.UNKNOWN_SYMBOL
+    assert eng.check("AAPL", "HOLD", 10, 100.0, 0.0) == risk.BAD_SIDE
+    assert eng.check("AAPL", "BUY", 0, 100.0, 0.0) == risk.BAD_QTY
+    assert eng.check("AAPL", "BUY", 10, float("nan"), 0.0) == risk.BAD_PRICE
+    assert eng.check("AAPL", "BUY", 10, 110.0, 0.0) == risk.PRICE_COLLAR_BREACH
+    assert eng.check("AAPL", "BUY", 60, 100.0, 0.0) == risk.NOTIONAL_LIMIT
+    assert eng.check("AAPL", "BUY", 20, 100.0, 0.0) == risk.OK
+    assert eng.check("AAPL", "BUY", 1, 100.0, 0.0) == risk.POSITION_LIMIT
+    assert eng.check("AAPL", "SELL", 30, 100.0, 0.0) == risk.OK
+    assert eng.position.tolist() == [0.0, 0.0]
+    assert eng.rejects[0].sum() == 6
+
+
+def test_order_rate_throttle_refills():
+    eng = _engine()
+    eng.set_limits("MSFT", max_rate=2.0, burst=2.0, tokens=2.0)
+    assert eng.check("MSFT", "BUY", 1, 10.0, 0.0) == risk.OK
+    assert eng.check("MSFT", "SELL", 1, 10.0, 0.0) == risk.OK
+    assert eng.check("MSFT", "BUY", 1, 10.0, 0.1) == risk.RATE_LIMIT
+    assert eng.check("MSFT", "BUY", 1, 10.0, 0.6) == risk.OK
+    # other symbols are throttled independently
+    assert eng.check("AAPL", "BUY", 1, 10.0, 0.6) == risk.OK
+
+
+def test_rejected_orders_use_up_the_throttle():
+    eng = _engine()
+    eng.set_limits("AAPL", max_rate=2.0, burst=2.0, tokens=2.0)
+    codes = [eng.check("AAPL", "BUY", 1000, 1.0, 0.0) for _ in range(1000)]   # breaches position
+    assert codes[:2] == [risk.POSITION_LIMIT] * 2
+    assert set(codes[2:]) == {risk.RATE_LIMIT}
+
+
+def test_check_is_microseconds():
+    eng = _engine()
+    n = 2000
+    t0 = time.perf_counter()
+    for k in range(n):
+        eng.check("AAPL", "BUY" if k % 2 else "SELL", 1, 100.0, k * 0.01)
+    # generous bound: only catches an accidental O(n) or per-order allocation blow-up
+    assert (time.perf_counter() - t0) / n < 1e-3
+
+
+@pytest.mark.timeout(10)
+def test_ordermanager_reports_rejections(ordermanager_proc, ports):
+    delim = b"*"
+    orders = [{"type": "order", "id": 7, "side": "BUY", "symbol": "NOPE", "qty": 1, "price": 1.0},
+              {"type": "order", "id": 8, "side": "BUY", "symbol": ["AAPL"], "qty": 1, "price": 1.0},
+              {"type": "order", "id": 9, "side": {"x": 1}, "symbol": "AAPL", "qty": 1, "price": 1.0},
+              {"type": "order", "id": 10, "side": "BUY", "symbol": "NOPE", "qty": 1, "price": 1.0}]
+    with socket.create_connection((ports["HOST"], ports["ORDER_PORT"]), timeout=2) as s:
+        s.sendall(b"".join(json.dumps(o).encode() + delim for o in orders))
+        data = b""
+        while data.count(delim) < len(orders):
+            chunk = s.recv(4096)
+            assert chunk, "OrderManager closed the connection"
+            data += chunk
+    msgs = [json.loads(m) for m in data.split(delim)[:len(orders)]]
+    assert all(m["type"] == "reject" for m in msgs)
+    # non-string symbol / side are rejected, and the connection keeps working after them
+    assert [(m["id"], m["reason"]) for m in msgs] == [
+        (7, "unknown_symbol"), (8, "unknown_symbol"), (9, "bad_side"), (10, "unknown_symbol")]
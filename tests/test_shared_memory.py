@@ -85,3 +85,83 @@ def test_shared_price_book_many_updates_is_consistent():
                     getattr(spb, method)()
                 except Exception:
                     pass
+
+
+@pytest.mark.timeout(10)
+def test_zero_config_attach_reads_layout_from_header():
+    """A reader needs only the name: symbols and columns come from the header."""
+    smu = importlib.import_module("shared_memory_utils")
+    writer = smu.SharedPriceBook.create(["AAPL", "MSFT", "GOOG"])
+    try:
+        writer.update("GOOG", 2800.5, ts=123.0)
+        reader = smu.SharedPriceBook.attach()
+        try:
+            assert reader.symbols == ["AAPL", "MSFT", "GOOG"]
+            assert reader.writer_pid == os.getpid() and reader.writer_alive()
+            seq, prices, ts = reader.snapshot()
+            assert seq == writer.seq and seq % 2 == 0
+            assert prices[2] == 2800.5 and ts[2] == 123.0
+            assert np.isnan(prices[0])       # never written
+        finally:
+            reader.close()
+    finally:
+        writer.close()
+        writer.unlink()
+
+
+@pytest.mark.timeout(10)
+def test_attach_rejects_foreign_region_and_detects_dead_writer():
+    smu = importlib.import_module("shared_memory_utils")
+    from multiprocessing import shared_memory
+
+    name = os.environ["PRICEBOOK_NAME"]
+    raw = shared_memory.SharedMemory(name=name, create=True, size=4096)
+    try:
+        with pytest.raises(smu.LayoutError):
+            smu.SharedPriceBook.attach(name, timeout=0)
+    finally:
+        raw.close()
+        raw.unlink()
+
+    book = smu.SharedPriceBook.create(["AAPL"], name=name)
+    try:
+        book.header["writer_pid"] = 2 ** 22 + 12345   # beyond default pid_max: no such process
+        assert not book.writer_alive()
+        # a new writer may take over a region whose writer is gone
+        book2 = smu.SharedPriceBook.create(["AAPL", "MSFT"], name=name)
+        assert book2.writer_pid == os.getpid() and book2.symbols == ["AAPL", "MSFT"]
+        book2.close()
+    finally:
+        book.close()
+        book.unlink()
+
+
+@pytest.mark.timeout(10)
+def test_sentiment_slot_written_by_orderbook_news_ingest():
+    """OrderBook parses the Gateway's JSON news into the book; readers need no socket."""
+    smu = importlib.import_module("shared_memory_utils")
+    orderbook = importlib.import_module("orderbook")
+    writer = smu.SharedPriceBook.create(["AAPL", "MSFT"])
+    reader = smu.SharedPriceBook.attach()
+    try:
+        news_seq, market, per = reader.sentiment()
+        assert news_seq == 0 and market == smu.NEUTRAL_SENTIMENT
+        assert per.tolist() == [market, market]
+
+        ingest = orderbook.NewsIngest(writer)
+        ingest.ingest(b'{"type":"news","sentiment":72,"ts":1.0}*{"type":"news","sentiment":15,"sym":"MSFT"}*'
+                      b'garbage*{"type":"news","sentiment":90,"sym":"ZZZZ"}*'
+                      b'{"type":"news","sentiment":1,"sym":["AAPL"]}*')   # malformed, not fatal
+        news_seq, market, per = reader.sentiment()
+        assert news_seq == 2 and market == 72.0
+        assert per.tolist() == [72.0, 15.0]          # AAPL falls back to the market score
+        assert reader.seq % 2 == 0
+
+        writer._seq[0] += 1                          # writer died mid-update: seq stays odd
+        assert reader.snapshot()[0] % 2 == 1
+        assert reader.sentiment()[:2] == (2, 72.0)
+        writer._seq[0] += 1
+    finally:
+        reader.close()
+        writer.close()
+        writer.unlink()
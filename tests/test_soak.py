@@ -0,0 +1,67 @@
+# tests/test_soak.py
+import pytest
+
+
+def _snap(component, pid, ts, counters=None, hists=None):
+    return {"component": component, "pid": pid, "ts": ts, "uptime": 10.0,
+            "counters": counters or {}, "histograms": hists or {}}
+
+
+def _hist(*values):
+    metrics = pytest.importorskip("metrics")
+    h = metrics.Histogram()
+    for v in values:
+        h.observe(v)
+    return h.summary()
+
+
+def test_counters_span_restarted_processes_and_histograms_merge():
+    soak = pytest.importorskip("soak")
+    before = {1: _snap("gateway-price", 1, 100.0, {"ticks_sent": 1000}),
+              3: _snap("orderbook", 3, 100.0, {"ticks": 900})}
+    after = {1: _snap("gateway-price", 1, 103.0, {"ticks_sent": 1300}),     # killed mid-run
+             2: _snap("gateway-price", 2, 110.0, {"ticks_sent": 500}),      # its replacement
+             3: _snap("orderbook", 3, 110.0, {"ticks": 1600}, {"tick_latency": _hist(0.001, 0.002)}),
+             4: _snap("strategy", 4, 110.0, {}, {"decision_latency": _hist(0.01)}),
+             5: _snap("strategy", 5, 110.0, {}, {"decision_latency": _hist(0.02, 0.03)})}
+    assert soak.counter_delta(before, after, "gateway", "ticks_sent") == 800
+    assert soak.counter_delta(before, after, "orderbook", "ticks") == 700
+
+    merged = soak.merged_histogram(after, "strategy", "decision_latency")
+    assert merged["count"] == 3 and merged["min"] == pytest.approx(0.01) and merged["max"] == pytest.approx(0.03)
+    assert merged["mean"] == pytest.approx(0.02)
+
+
+def test_report_is_rendered_from_measurements_and_compared_to_baseline():
+    soak = pytest.importorskip("soak")
+    args = soak.parse_args(["--duration", "10", "--symbols", "2", "--restart-gateway", "3"])
+    before = {1: _snap("gateway-price", 1, 100.0, {"ticks_sent": 0}), 2: _snap("orderbook", 2, 100.0)}
+    after = {1: _snap("gateway-price", 1, 110.0, {"ticks_sent": 1000}),
+             2: _snap("orderbook", 2, 110.0, {"ticks": 900, "reconnects": 1},
+                      {"tick_latency": _hist(0.001), "reconnect_time": _hist(3.0)})}
+
+    class Sampler:
+        def results(self):
+            return {2: {"rss_max_mb": 30.0, "rss_mean_mb": 29.0, "cpu_pct": 12.5},
+                    99: {"rss_max_mb": 5.0, "rss_mean_mb": 5.0, "cpu_pct": 0.0}}   # not a component
+
+    shm = {"name": "pb", "version": 2, "n_symbols": 2, "header": 128, "symbol_table": 32, "column_table": 96,
+           "padding": 0, "columns": ["price", "ts", "sentiment"], "column_data": 192, "size": 448, "pages": 1}
+    restart = {"at_s": 3.0, "down_s": 1.0, "reconnect_s": 2.5, "outage_s": 3.5}
+    res = soak.collect(args, before, after, 10.0, Sampler(), shm, restart)
+
+    head = res["headline"]
+    assert head["gateway_ticks_per_s"] == pytest.approx(100.0)
+    assert head["ticks_not_applied"] == 100
+    assert head["reconnect_s"] == 2.5
+    assert [p["pid"] for p in res["processes"]] == [2]
+
+    report = soak.render(res)
+    assert "## 4. Shared Memory Footprint" in report and "**448**" in report
+    assert "| Gateway ticks sent | 1,000 | 100.0 |" in report
+    assert "| OrderBook price reconnects | 1 |" in report
+
+    baseline = dict(res, headline=dict(head, gateway_ticks_per_s=50.0), env=dict(res["env"], commit="abc1234"))
+    compared = soak.render(res, baseline)
+    assert "Compared with commit `abc1234`" in compared
+    assert "| Gateway ticks/s | 100.00 | 50.00 | +100.0% (better) |" in compared
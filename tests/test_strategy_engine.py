@@ -0,0 +1,136 @@
+# tests/test_strategy_engine.py
+import os
+
+import pytest
+
+
+def _import_strategy():
+    return pytest.importorskip("strategy")
+
+
+def _step(engine, prices, sentiment=50.0):
+    """One decision-loop step on the array path; returns [(strategy, symbol, side)]."""
+    import numpy as np
+
+    strat = _import_strategy()
+    px = np.array(prices, dtype=float)
+    sent = np.full(len(prices), float(sentiment))
+    slots = [strat.OrderSlot() for _ in range(len(engine.strategies) * len(prices))]
+    if not engine.on_arrays(px, sent):
+        return []
+    k = engine.decide_into(sent, slots)
+    return [(s.strategy.name, engine.symbols[s.sym_id], s.side) for s in slots[:k]]
+
+
+def test_indicator_computed_once_per_tick_and_shared():
+    strat = _import_strategy()
+    syms = ["AAPL", "MSFT"]
+    engine = strat.StrategyEngine(strat.load_strategies("ma_news,ma_cross", syms), syms)
+    for i in range(strat.LONG_WINDOW):
+        _step(engine, [100.0 + i, 200.0 - i])
+
+    before = engine.indicators.computed
+    orders = _step(engine, [150.0, 180.0], 80)
+    # 2 symbols x (sma short, sma long); both strategies share them
+    assert engine.indicators.computed - before == 4
+    assert ("ma_news", "AAPL", "BUY") in orders
+    assert ("ma_cross", "MSFT", "SELL") in orders
+
+
+def test_unchanged_inputs_are_not_reevaluated():
+    strat = _import_strategy()
+    syms = ["AAPL", "MSFT"]
+    engine = strat.StrategyEngine(strat.load_strategies("ma_cross", syms), syms)
+    for i in range(strat.LONG_WINDOW):
+        _step(engine, [100.0 + i, 100.0 + i])
+
+    before = engine.indicators.computed
+    assert _step(engine, [130.0, 100.0 + strat.LONG_WINDOW - 1]) == [("ma_cross", "AAPL", "BUY")]
+    assert engine.indicators.computed - before == 2   # only AAPL recomputed
+    assert engine._changed.tolist() == [True, False]
+    assert _step(engine, [130.0, 100.0 + strat.LONG_WINDOW - 1]) == []   # nothing moved at all
+
+
+def test_ring_buffer_sma_matches_full_history():
+    strat = _import_strategy()
+    cache = strat.IndicatorCache(["AAPL"], lookback=strat.LONG_WINDOW)
+    history = [100.0 + (i * 7919 % 23) for i in range(3 * strat.LONG_WINDOW + 3)]   # wraps the ring
+    for n, px in enumerate(history, 1):
+        cache.push(0, px)
+        window = history[:n][-strat.SHORT_WINDOW:]
+        expected = sum(window) / len(window) if n >= strat.SHORT_WINDOW else None
+        assert cache.get("AAPL", "sma", strat.SHORT_WINDOW) == pytest.approx(expected)
+    assert cache.get("AAPL", "prices").tolist() == history[-strat.LONG_WINDOW:]
+    assert cache.push(0, history[-1]) is False          # repeated price: nothing invalidated
+
+
+def test_register_custom_strategy():
+    strat = _import_strategy()
+
+    @strat.register_strategy("always_buy_test")
+    class AlwaysBuy(strat.BaseStrategy):
+        def decide(self, sym, ind, sentiment):
+            return "BUY"
+
+    engine = strat.StrategyEngine(strat.load_strategies("always_buy_test", ["AAPL"]), ["AAPL"])
+    assert _step(engine, [1.0]) == [("always_buy_test", "AAPL", "BUY")]
+    with pytest.raises(ValueError):
+        strat.load_strategies("nope", ["AAPL"])
+
+
+def test_decision_loop_encodes_orders_like_json_dumps():
+    import json
+    import socket
+
+    strat = _import_strategy()
+    smu = pytest.importorskip("shared_memory_utils")
+    syms = ["AAPL", "MSFT"]
+    book = smu.SharedPriceBook.create(syms, name=f"pb-loop-test-{os.getpid()}")
+    a, b = socket.socketpair()
+    try:
+        engine = strat.StrategyEngine(strat.load_strategies("ma_cross,ma_news", syms), syms)
+        loop = strat.DecisionLoop(book, syms, engine)
+        for i in range(strat.LONG_WINDOW):
+            book.update("AAPL", 100.0 + i)
+            book.update("MSFT", 200.0 - i)
+            loop.cycle()
+            loop.send(a)
+        book.update_sentiment(80)
+        assert loop.cycle() == 1 and loop.send(a) == 1
+        assert loop.cycle() == 0   # book unchanged: nothing to do
+
+        frames = [f for f in b.recv(65536).split(strat.MESSAGE_DELIMITER) if f]
+        assert all(f.decode() == json.dumps(json.loads(f)) for f in frames)
+        orders = [json.loads(f) for f in frames]
+        assert [(o["strategy"], o["symbol"], o["side"]) for o in orders] == [
+            ("ma_cross", "AAPL", "BUY"), ("ma_cross", "MSFT", "SELL"), ("ma_news", "AAPL", "BUY")]
+        assert orders[-1]["sentiment"] == 80.0 and orders[-1]["price"] == 119.0
+        assert engine.strategies[1].position["AAPL"] == "LONG"
+    finally:
+        a.close()
+        b.close()
+        book.close()
+        book.unlink()
+
+
+def test_decision_loop_rereads_sentiment_only_when_news_arrives():
+    strat = _import_strategy()
+    smu = pytest.importorskip("shared_memory_utils")
+    book = smu.SharedPriceBook.create(["AAPL"], name=f"pb-news-test-{os.getpid()}")
+    try:
+        engine = strat.StrategyEngine(strat.load_strategies("ma_news", ["AAPL"]), ["AAPL"])
+        loop = strat.DecisionLoop(book, ["AAPL"], engine)
+        reads = []
+        real = book.sentiment
+        book.sentiment = lambda out=None: (reads.append(1), real(out))[1]
+        book.update("AAPL", 1.0)
+        loop.cycle()
+        book.update("AAPL", 2.0)
+        loop.cycle()
+        assert len(reads) == 1          # the price-only tick left news_seq alone
+        book.update_sentiment(70, symbol="AAPL")
+        loop.cycle()
+        assert len(reads) == 2 and loop.sent.tolist() == [70.0]
+    finally:
+        book.close()
+        book.unlink()
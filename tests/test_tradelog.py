@@ -0,0 +1,89 @@
+# tests/test_tradelog.py
+import json
+
+import numpy as np
+import pytest
+
+tradelog = pytest.importorskip("tradelog")
+
+
+def _order(sym, side, qty, px, sentiment=50, ts=1.0, **extra):
+    return json.dumps({"type": "order", "symbol": sym, "side": side, "qty": qty, "price": px,
+                       "sentiment": sentiment, **extra, "timestamp": ts}) + "\n"
+
+
+def test_columns_match_json_and_odd_lines_fall_back(tmp_path):
+    path = tmp_path / "trades.log"
+    path.write_text(_order("AAPL", "BUY", 10, 100.0, ts=1.0)
+                    + _order("MSFT", "SELL", 5, 200.5, 13.0, ts=2.0, strategy="ma_news")
+                    + '{"timestamp": 3.0, "qty": 1, "side": "BUY", "price": 50, "symbol": "GOOG", "type": "order"}\n'
+                    + '{"type": "reject", "symbol": "AAPL"}\n'
+                    + "not json\n")
+    log = tradelog.TradeLog(str(path), cache=False)
+    assert len(log) == 3 and log.skipped == 2
+    assert [log.symbols[i] for i in log["sym"]] == ["AAPL", "MSFT", "GOOG"]
+    assert log["side"].tolist() == [1, -1, 1]
+    assert log["price"].tolist() == [100.0, 200.5, 50.0]
+    assert log["ts"].tolist() == [1.0, 2.0, 3.0]
+    assert log["sentiment"][1] == 13.0 and np.isnan(log["sentiment"][2])   # missing sentiment
+
+
+def test_sidecar_is_reused_and_only_appended_lines_are_parsed(tmp_path, monkeypatch):
+    path = tmp_path / "trades.log"
+    path.write_text("".join(_order("AAPL", "BUY", 1, 100.0 + i) for i in range(50)))
+    first = tradelog.TradeLog(str(path))
+    assert (tmp_path / "trades.log.cols.npz").exists()
+
+    with path.open("a") as f:
+        f.write(_order("MSFT", "SELL", 2, 10.0) + '{"type": "order", "sym')   # last line still being written
+    parsed = []
+    real = tradelog.TradeLog._parse
+    monkeypatch.setattr(tradelog.TradeLog, "_parse", lambda self, data: (parsed.append(data), real(self, data)))
+    log = tradelog.TradeLog(str(path), symbols=["AAPL"])
+    assert len(log) == 51 and len(parsed) == 1 and parsed[0].count(b"\n") == 1
+    assert np.array_equal(log["price"][:50], first["price"])
+
+    with path.open("a") as f:
+        f.write('bol": "MSFT", "side": "BUY", "qty": 2, "price": 11.0, "sentiment": 50, "timestamp": 5.0}\n')
+    new = log.refresh()
+    assert (new.start, new.stop) == (51, 52) and log["price"][-1] == 11.0
+
+    path.write_text(_order("GOOG", "BUY", 1, 5.0))   # rotated: the sidecar no longer matches
+    rotated = tradelog.TradeLog(str(path))
+    assert len(rotated) == 1 and rotated.symbols == ["GOOG"]
+
+
+def test_vectorized_position_turnover_and_pnl(tmp_path):
+    path = tmp_path / "trades.log"
+    path.write_text(_order("AAPL", "BUY", 10, 100.0) + _order("MSFT", "SELL", 5, 50.0)
+                    + _order("AAPL", "SELL", 4, 110.0) + _order("AAPL", "BUY", 2, 90.0))
+    log = tradelog.TradeLog(str(path), cache=False)
+    aapl, msft = log.ids["AAPL"], log.ids["MSFT"]
+
+    assert log.positions()[[aapl, msft]].tolist() == [8.0, -5.0]
+    assert log.turnover()[aapl] == pytest.approx(1000 + 440 + 180)
+    assert log.position_path().tolist() == [10.0, -5.0, 6.0, 8.0]
+    # AAPL cash: -1000 + 440 - 180 = -740; 8 shares marked at the last trade (90)
+    assert log.pnl()[aapl] == pytest.approx(-740 + 8 * 90)
+    assert log.pnl(marks=[100.0, 40.0])[[aapl, msft]].tolist() == pytest.approx([60.0, 50.0])
+    # AAPL after each of its trades, marked at that trade's price: -560 + 6 * 110 = 100, then -740 + 8 * 90
+    assert log.pnl_path()[[0, 2, 3]].tolist() == pytest.approx([0.0, 100.0, -20.0])
+    assert log.summary()["MSFT"] == {"trades": 1, "position": -5.0, "turnover": 250.0, "pnl": 0.0}
+
+
+def test_non_finite_price_or_qty_rows_are_skipped(tmp_path):
+    path = tmp_path / "trades.log"
+    path.write_text(_order("AAPL", "BUY", 10, 100.0) + _order("AAPL", "SELL", 10, float("nan"))
+                    + _order("AAPL", "SELL", float("inf"), 100.0))
+    log = tradelog.TradeLog(str(path), cache=False)
+    assert len(log) == 1 and log.skipped == 2
+    assert log.pnl().tolist() == [0.0] and log.turnover().tolist() == [1000.0]
+
+
+def test_corrupt_number_skips_the_line_not_the_load(tmp_path):
+    path = tmp_path / "trades.log"
+    path.write_text(_order("AAPL", "BUY", 10, 100.0).replace("100.0", "1.2.3")
+                    + _order("AAPL", "BUY", 1, 5.0).replace('"qty": 1', '"qty": 1-2')
+                    + _order("AAPL", "SELL", 10, 101.0))
+    log = tradelog.TradeLog(str(path), cache=False)
+    assert len(log) == 1 and log.skipped == 2 and log["price"].tolist() == [101.0]
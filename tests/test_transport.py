@@ -0,0 +1,59 @@
+# tests/test_transport.py
+import errno
+import socket
+import threading
+
+import pytest
+
+from conftest import find_free_port
+
+transport = pytest.importorskip("transport")
+
+
+def _echo_once(srv):
+    c, _ = srv.accept()
+    with c:
+        c.sendall(c.recv(64))
+
+
+@pytest.mark.timeout(10)
+@pytest.mark.skipif(not hasattr(socket, "AF_UNIX"), reason="AF_UNIX not available")
+def test_unix_endpoint_roundtrip(tmp_path):
+    host = f"unix://{tmp_path}/om"
+    family, addr = transport.address(host, 5003)
+    assert family == socket.AF_UNIX and addr == f"{tmp_path}/om.5003"
+
+    srv = transport.listen(host, 5003)
+    try:
+        threading.Thread(target=_echo_once, args=(srv,), daemon=True).start()
+        with transport.connect(host, 5003, timeout=2) as c:
+            c.sendall(b"ping*")
+            assert c.recv(64) == b"ping*"
+    finally:
+        srv.close()
+    # a stale socket file left behind must not block the next bind
+    srv = transport.listen(host, 5003)
+    try:
+        # ... but a live server's must, as with TCP
+        with pytest.raises(OSError) as e:
+            transport.listen(host, 5003)
+        assert e.value.errno == errno.EADDRINUSE
+        with transport.connect(host, 5003, timeout=2):
+            pass
+    finally:
+        srv.close()
+
+
+@pytest.mark.timeout(10)
+def test_plain_host_falls_back_to_tcp():
+    port = find_free_port()
+    family, addr = transport.address("127.0.0.1", port)
+    assert family == socket.AF_INET and addr == ("127.0.0.1", port)
+    srv = transport.listen("127.0.0.1", port)
+    try:
+        threading.Thread(target=_echo_once, args=(srv,), daemon=True).start()
+        with transport.connect("127.0.0.1", port, timeout=2) as c:
+            c.sendall(b"x*")
+            assert c.recv(64) == b"x*"
+    finally:
+        srv.close()
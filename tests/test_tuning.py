@@ -0,0 +1,32 @@
+# tests/test_tuning.py
+import os
+
+import pytest
+
+tuning = pytest.importorskip("tuning")
+
+
+def test_parse_cpus():
+    assert tuning.parse_cpus("0,2-3, 5") == {0, 2, 3, 5}
+    assert tuning.parse_cpus("") == set()
+
+
+@pytest.mark.skipif(not hasattr(os, "sched_setaffinity"), reason="no sched_setaffinity")
+def test_apply_pins_to_allowed_cpu(monkeypatch):
+    original = os.sched_getaffinity(0)
+    cpu = min(original)
+    monkeypatch.setenv("TUNETEST_CPUS", str(cpu))
+    monkeypatch.setenv("TUNETEST_BUSY_POLL", "1")
+    try:
+        applied = tuning.apply("tunetest")
+        assert applied["cpus"] == [cpu]
+        assert applied["busy_poll"] is True
+        assert tuning.busy_poll("tunetest")
+    finally:
+        os.sched_setaffinity(0, original)
+
+
+def test_unpermitted_settings_are_skipped(monkeypatch, capsys):
+    monkeypatch.setenv("TUNETEST_RT_PRIORITY", "not-a-number")
+    assert "rt_priority" not in tuning.apply("tunetest")
+    assert "failed" in capsys.readouterr().out
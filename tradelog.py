@@ -0,0 +1,275 @@
+# tradelog.py
+# ---------------------------------------------------
+# Columnar loader and analytics for the order log (trades.log, one JSON
+# order per line).
+#
+# Lines are parsed into NumPy columns (symbol id, side, qty, price,
+# sentiment, timestamp). The first pass matches every line of the buffer
+# with one regex and converts the captured fields in bulk; lines of another
+# shape (key order, nulls, non-order lines) fall back to json.loads. Parsed columns go to a binary sidecar
+# (<log>.cols.npz) keyed by the byte offset they cover, so the next load
+# reads the sidecar and only parses what was appended since. refresh()
+# picks up lines appended to a log that is still being written.
+#
+#   python tradelog.py trades.log            per-symbol position / turnover / PnL
+#   python tradelog.py trades.log --follow   keep tailing, print as lines arrive
+# ---------------------------------------------------
+
+import argparse
+import json
+import os
+import re
+import time
+import zlib
+
+import numpy as np
+
+TRADES_LOG = os.getenv("TRADES_LOG", "trades.log")
+SIDECAR_SUFFIX = ".cols.npz"
+FINGERPRINT_BYTES = 4096
+
+COLUMNS = (("sym", np.int32), ("side", np.int8), ("qty", np.float64),
+           ("price", np.float64), ("sentiment", np.float64), ("ts", np.float64))
+
+# an order line exactly as json.dumps writes it (Strategy may add "strategy");
+# anything else goes through json.loads
+_NUM = rb'(-?(?:0|[1-9][0-9]*)(?:\.[0-9]+)?(?:[eE][+-]?[0-9]+)?|NaN)'   # JSON number grammar (+ NaN)
+_ORDER_LINE = re.compile(
+    rb'^\{"type": "order", "symbol": "([^"]*)", "side": "([A-Z]*)", "qty": ' + _NUM +
+    rb', "price": ' + _NUM + rb', "sentiment": ' + _NUM + rb',(?: "strategy": "[^"]*",)? "timestamp": ' + _NUM +
+    rb'\}\r?$', re.M)
+
+
+def _group_cumsum(ids, values, n_groups):
+    """Running sum of `values` within each id, returned in the original row order."""
+    order = np.argsort(ids, kind="stable")
+    cs = np.cumsum(values[order])
+    starts = np.searchsorted(ids[order], np.arange(n_groups))
+    before = np.concatenate(([0.0], cs))[starts]   # running total just before each group starts
+    out = np.empty_like(cs)
+    out[order] = cs - before[ids[order]]
+    return out
+
+
+class TradeLog:
+    """
+    The order log as growable NumPy columns: log["price"], log["sym"], ...
+    Symbol ids index `log.symbols`: the `symbols` given, then others as they turn up.
+    Rows with an unknown side or a non-finite qty / price are counted in `skipped`.
+    refresh() only parses; save_sidecar() persists what has been loaded so far.
+    """
+
+    def __init__(self, path=TRADES_LOG, symbols=(), cache=True):
+        self.path = path
+        self.sidecar = path + SIDECAR_SUFFIX if cache else None
+        self.symbols = list(symbols)
+        self.ids = {s: i for i, s in enumerate(self.symbols)}
+        self.offset = 0           # bytes of the log already parsed (always at a line boundary)
+        self.n = 0
+        self.skipped = 0          # lines that were not parseable orders
+        self._cols = {name: np.empty(1024, dt) for name, dt in COLUMNS}
+        if self.sidecar is None or not self._load_sidecar():
+            self.refresh()
+            if self.sidecar is not None and self.offset:
+                self.save_sidecar()
+
+    def __len__(self):
+        return self.n
+
+    def __getitem__(self, name):
+        return self._cols[name][:self.n]
+
+    # ---------- loading ----------
+
+    def refresh(self):
+        """Parse lines appended since the last call; returns the slice of new rows."""
+        start = self.n
+        try:
+            size = os.path.getsize(self.path)
+        except FileNotFoundError:
+            return slice(start, start)
+        if size < self.offset:   # truncated or rotated: start over
+            self._reset()
+            start = 0
+        if size > self.offset:
+            with open(self.path, "rb") as f:
+                f.seek(self.offset)
+                data = f.read(size - self.offset)
+            end = data.rfind(b"\n") + 1   # a partial last line waits for its newline
+            if end:
+                self._parse(data[:end])
+                self.offset += end
+        return slice(start, self.n)
+
+    def _reset(self):
+        self.offset = self.n = self.skipped = 0
+
+    def _parse(self, data):
+        rows = _ORDER_LINE.findall(data)
+        if len(rows) != data.count(b"\n"):
+            # some lines have another shape: keep row order, json.loads only those
+            rows = []
+            for line in data.splitlines():
+                m = _ORDER_LINE.match(line)
+                row = m.groups() if m else self._parse_line(line)
+                if row is not None:
+                    rows.append(row)
+        if not rows:
+            return
+        raw = np.array(rows)   # (n, 6) byte strings: symbol, side, qty, price, sentiment, timestamp
+        nums = raw[:, 2:].astype(np.float64)
+        side = np.zeros(len(raw), np.int8)
+        side[raw[:, 1] == b"BUY"] = 1
+        side[raw[:, 1] == b"SELL"] = -1
+        names, inv = np.unique(raw[:, 0], return_inverse=True)
+        for s in names:
+            s = s.decode()
+            if s not in self.ids:
+                self.ids[s] = len(self.symbols)
+                self.symbols.append(s)
+        sym = np.array([self.ids[s.decode()] for s in names], np.int32)[inv.ravel()]
+        keep = (side != 0) & np.isfinite(nums[:, 0]) & np.isfinite(nums[:, 1])   # NaN qty/price would poison the sums
+        self.skipped += int(len(raw) - keep.sum())
+        self._append({"sym": sym[keep], "side": side[keep], "qty": nums[keep, 0], "price": nums[keep, 1],
+                      "sentiment": nums[keep, 2], "ts": nums[keep, 3]})
+
+    def _parse_line(self, line):
+        """json.loads fallback; returns the same byte-string row the regex yields, or None."""
+        try:
+            o = json.loads(line)
+            if o.get("type", "order") != "order":
+                raise ValueError("not an order")
+            sentiment = o.get("sentiment")
+            row = (o.get("symbol", o.get("sym")), o["side"], o["qty"], o["price"],
+                   "nan" if sentiment is None else sentiment, o.get("timestamp", o.get("ts")))
+            float(row[2]), float(row[3]), float(row[4]), float(row[5])
+            return tuple(str(v).encode() for v in row)
+        except (ValueError, KeyError, TypeError, AttributeError):
+            if line.strip():
+                self.skipped += 1
+            return None
+
+    def _append(self, cols):
+        k = len(cols["sym"])
+        need = self.n + k
+        if need > len(self._cols["sym"]):
+            cap = max(need, 2 * len(self._cols["sym"]))
+            for name, dt in COLUMNS:
+                grown = np.empty(cap, dt)
+                grown[:self.n] = self._cols[name][:self.n]
+                self._cols[name] = grown
+        for name, _ in COLUMNS:
+            self._cols[name][self.n:need] = cols[name]
+        self.n = need
+
+    # ---------- sidecar ----------
+
+    def _fingerprint(self, offset):
+        """Checksum of the head and of the bytes just before `offset`: detects a replaced log."""
+        with open(self.path, "rb") as f:
+            head = f.read(min(offset, FINGERPRINT_BYTES))
+            f.seek(max(0, offset - FINGERPRINT_BYTES))
+            tail = f.read(offset - max(0, offset - FINGERPRINT_BYTES))
+        return zlib.crc32(tail, zlib.crc32(head))
+
+    def save_sidecar(self):
+        tmp = self.sidecar + ".tmp"
+        with open(tmp, "wb") as f:
+            np.savez(f, offset=np.int64(self.offset), skipped=np.int64(self.skipped),
+                     fingerprint=np.int64(self._fingerprint(self.offset)),
+                     symbols=np.array(self.symbols, dtype=str),
+                     **{name: self[name] for name, _ in COLUMNS})
+        os.replace(tmp, self.sidecar)
+
+    def _load_sidecar(self):
+        """Adopt the sidecar if it still describes a prefix of the log, then parse the rest."""
+        try:
+            with np.load(self.sidecar) as z:
+                offset = int(z["offset"])
+                if offset > os.path.getsize(self.path) or int(z["fingerprint"]) != self._fingerprint(offset):
+                    return False
+                cached = [str(s) for s in z["symbols"]]
+                if cached[:len(self.symbols)] != self.symbols:
+                    return False   # caller asked for a different id order
+                cols = {name: z[name] for name, _ in COLUMNS}
+                skipped = int(z["skipped"])
+        except (OSError, KeyError, ValueError):
+            return False
+        self.symbols = cached
+        self.ids = {s: i for i, s in enumerate(cached)}
+        self._append(cols)
+        self.offset, self.skipped = offset, skipped
+        if self.refresh().stop > len(cols["sym"]):
+            self.save_sidecar()   # so the next load starts from here
+        return True
+
+    # ---------- analytics ----------
+
+    def signed_qty(self):
+        return self["side"] * self["qty"]
+
+    def positions(self):
+        """Net position per symbol id."""
+        return np.bincount(self["sym"], self.signed_qty(), len(self.symbols))
+
+    def turnover(self):
+        """Traded notional (qty * price) per symbol id."""
+        return np.bincount(self["sym"], self["qty"] * self["price"], len(self.symbols))
+
+    def last_prices(self):
+        """Last traded price per symbol id (NaN if never traded)."""
+        last = np.full(len(self.symbols), np.nan)
+        last[self["sym"]] = self["price"]   # later rows win
+        return last
+
+    def pnl(self, marks=None):
+        """Cash flow plus open position marked at `marks` (default: last traded price) per symbol id."""
+        marks = self.last_prices() if marks is None else np.asarray(marks, dtype=np.float64)
+        cash = -np.bincount(self["sym"], self.signed_qty() * self["price"], len(self.symbols))
+        pos = self.positions()
+        return cash + np.where(pos != 0, pos * marks, 0.0)
+
+    def position_path(self):
+        """Per row: the position in that row's symbol after the trade."""
+        return _group_cumsum(self["sym"], self.signed_qty(), len(self.symbols))
+
+    def pnl_path(self):
+        """Per row: that symbol's PnL after the trade, marked at the trade price."""
+        cash = _group_cumsum(self["sym"], -self.signed_qty() * self["price"], len(self.symbols))
+        return cash + self.position_path() * self["price"]
+
+    def summary(self):
+        pos, turn, pnl = self.positions(), self.turnover(), self.pnl()
+        counts = np.bincount(self["sym"], minlength=len(self.symbols))
+        return {s: {"trades": int(counts[i]), "position": float(pos[i]), "turnover": float(turn[i]),
+                    "pnl": float(pnl[i])} for i, s in enumerate(self.symbols)}
+
+
+def _print_summary(log, took):
+    print(f"{len(log)} orders from {log.path} in {took * 1e3:.1f} ms ({log.skipped} skipped lines)")
+    print(f"{'symbol':8} {'trades':>7} {'position':>9} {'turnover':>14} {'pnl':>12}")
+    for sym, s in log.summary().items():
+        print(f"{sym:8} {s['trades']:7d} {s['position']:9.0f} {s['turnover']:14,.2f} {s['pnl']:12,.2f}")
+
+
+def main(argv=None):
+    p = argparse.ArgumentParser(description="Load the order log into columns and print position / turnover / PnL")
+    p.add_argument("path", nargs="?", default=TRADES_LOG)
+    p.add_argument("--no-cache", action="store_true", help="Neither read nor write the sidecar")
+    p.add_argument("--follow", action="store_true", help="Keep tailing the log")
+    p.add_argument("--interval", type=float, default=1.0, help="Seconds between polls with --follow")
+    args = p.parse_args(argv)
+
+    t0 = time.perf_counter()
+    log = TradeLog(args.path, cache=not args.no_cache)
+    _print_summary(log, time.perf_counter() - t0)
+    while args.follow:
+        time.sleep(args.interval)
+        t0 = time.perf_counter()
+        new = log.refresh()
+        if new.stop > new.start:
+            _print_summary(log, time.perf_counter() - t0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+# transport.py
+# ---------------------------------------------------
+# Endpoint helpers shared by every process.
+# A host of the form "unix:///path" selects an AF_UNIX stream socket
+# at "<path>.<port>" (so one prefix can serve several ports); anything
+# else is plain TCP. Platforms without AF_UNIX fall back to loopback TCP.
+# ---------------------------------------------------
+
+import errno
+import os
+import socket
+import stat
+
+UNIX_PREFIX = "unix://"
+
+
+def address(host, port):
+    """Return (family, sockaddr) for a host/port pair."""
+    if host.startswith(UNIX_PREFIX):
+        if hasattr(socket, "AF_UNIX"):
+            return socket.AF_UNIX, f"{host[len(UNIX_PREFIX):]}.{port}"
+        host = "127.0.0.1"
+    return socket.AF_INET, (host, port)
+
+
+def describe(host, port):
+    family, addr = address(host, port)
+    return addr if family != socket.AF_INET else f"{addr[0]}:{addr[1]}"
+
+
+def listen(host, port, backlog=128):
+    """
+    Bind and listen on host/port. A unix socket file nobody is listening on
+    (left by a crashed server) is replaced; one with a live server raises
+    EADDRINUSE, as TCP would.
+    """
+    family, addr = address(host, port)
+    s = socket.socket(family, socket.SOCK_STREAM)
+    if family == socket.AF_INET:
+        s.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)  # important on macOS
+    else:
+        try:
+            if stat.S_ISSOCK(os.stat(addr).st_mode):
+                _unlink_if_stale(addr)
+        except FileNotFoundError:
+            pass
+        except OSError:
+            s.close()
+            raise
+    try:
+        s.bind(addr)
+    except OSError:
+        s.close()
+        raise
+    s.listen(backlog)
+    return s
+
+
+def _unlink_if_stale(path):
+    """Remove the socket file at `path` unless a server still accepts on it."""
+    probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        probe.connect(path)
+    except ConnectionRefusedError:
+        os.unlink(path)
+        return
+    finally:
+        probe.close()
+    raise OSError(errno.EADDRINUSE, os.strerror(errno.EADDRINUSE), path)
+
+
+def connect(host, port, timeout=None):
+    """Open a stream connection to host/port (unix or TCP)."""
+    family, addr = address(host, port)
+    if family == socket.AF_INET:
+        return socket.create_connection(addr, timeout=timeout)
+    s = socket.socket(family, socket.SOCK_STREAM)
+    s.settimeout(timeout)
+    try:
+        s.connect(addr)
+    except OSError:
+        s.close()
+        raise
+    return s
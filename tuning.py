@@ -0,0 +1,68 @@
+# tuning.py
+# ---------------------------------------------------
+# Per-component OS scheduling knobs for latency-critical processes.
+# Each component reads its own env vars (prefix = component name upper-cased):
+#   <C>_CPUS         cores to pin to, e.g. "2" / "2,3" / "4-7"   (os.sched_setaffinity)
+#   <C>_NICE         absolute nice value, e.g. "-5"               (needs privilege to lower)
+#   <C>_RT_PRIORITY  SCHED_FIFO priority 1-99                     (needs CAP_SYS_NICE)
+#   <C>_BUSY_POLL    "1" to spin instead of sleeping/blocking (OrderBook, Strategy)
+# Anything the platform or permissions don't allow is reported and skipped.
+# ---------------------------------------------------
+
+import os
+
+
+def _env(component, name):
+    return os.getenv(f"{component.upper()}_{name}", "").strip()
+
+
+def parse_cpus(spec):
+    """"0,2-3" -> {0, 2, 3}"""
+    cpus = set()
+    for part in filter(None, (p.strip() for p in spec.split(","))):
+        lo, _, hi = part.partition("-")
+        cpus.update(range(int(lo), int(hi or lo) + 1))
+    return cpus
+
+
+def busy_poll(component):
+    return _env(component, "BUSY_POLL") not in ("", "0")
+
+
+def apply(component):
+    """Apply affinity / priority settings for this process; returns what was applied."""
+    tag = f"[{component}]"
+    applied = {}
+
+    cpus = _env(component, "CPUS")
+    if cpus:
+        if hasattr(os, "sched_setaffinity"):
+            try:
+                os.sched_setaffinity(0, parse_cpus(cpus))
+                applied["cpus"] = sorted(os.sched_getaffinity(0))
+            except (OSError, ValueError) as e:
+                print(f"{tag} CPU pinning to {cpus!r} failed: {e}", flush=True)
+        else:
+            print(f"{tag} CPU pinning not supported on this platform", flush=True)
+
+    nice = _env(component, "NICE")
+    if nice:
+        try:
+            os.setpriority(os.PRIO_PROCESS, 0, int(nice))
+            applied["nice"] = os.getpriority(os.PRIO_PROCESS, 0)
+        except (AttributeError, OSError, ValueError) as e:
+            print(f"{tag} setting nice {nice} failed: {e}", flush=True)
+
+    rt = _env(component, "RT_PRIORITY")
+    if rt:
+        try:
+            os.sched_setscheduler(0, os.SCHED_FIFO, os.sched_param(int(rt)))
+            applied["rt_priority"] = int(rt)
+        except (AttributeError, OSError, ValueError) as e:
+            print(f"{tag} SCHED_FIFO priority {rt} failed: {e}", flush=True)
+
+    if busy_poll(component):
+        applied["busy_poll"] = True
+    if applied:
+        print(f"{tag} tuning: {applied}", flush=True)
+    return applied